@@ -1,5 +1,5 @@
 import os
-import json
+import re
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -9,8 +9,24 @@ API_ID = int(os.getenv('API_ID', 0))
 API_HASH = os.getenv('API_HASH', '')
 BOT_TOKEN = os.getenv('BOT_TOKEN', '')
 
-# User session for group creation
-STRING_SESSION1 = os.getenv('STRING_SESSION1', '')
+# User sessions for group creation - STRING_SESSION1, STRING_SESSION2, ... STRING_SESSIONn
+_SESSION_NUMBERS = sorted(
+    int(key[len('STRING_SESSION'):]) for key in os.environ
+    if re.fullmatch(r'STRING_SESSION\d+', key)
+)
+STRING_SESSIONS = {
+    f"session{number}": os.environ[f'STRING_SESSION{number}']
+    for number in _SESSION_NUMBERS if os.environ[f'STRING_SESSION{number}']
+}
+
+# User client pool health checks (seconds)
+USER_POOL_HEALTH_INTERVAL = int(os.getenv('USER_POOL_HEALTH_INTERVAL', 60))
+USER_POOL_MAX_BACKOFF = int(os.getenv('USER_POOL_MAX_BACKOFF', 300))
+
+# Pre-provisioned groups kept ready per type (low 0 disables the pool)
+GROUP_POOL_LOW = int(os.getenv('GROUP_POOL_LOW', 1))
+GROUP_POOL_HIGH = int(os.getenv('GROUP_POOL_HIGH', 3))
+GROUP_POOL_FILE = 'data/group_pool.json'
 
 # Bot username (will be set dynamically)
 BOT_USERNAME = ""
@@ -26,28 +42,77 @@ P2P_IMAGE = ""
 # Ensure data directory exists
 os.makedirs('data', exist_ok=True)
 
-# Simple group counter
+# Service message deletion batching (window in seconds, max ids per request)
+DELETE_BATCH_WINDOW = float(os.getenv('DELETE_BATCH_WINDOW', 1.0))
+DELETE_BATCH_MAX = int(os.getenv('DELETE_BATCH_MAX', 50))
+
+# Logo rendering worker processes
+LOGO_RENDER_WORKERS = int(os.getenv('LOGO_RENDER_WORKERS', 2))
+LOGO_RENDER_QUEUE = int(os.getenv('LOGO_RENDER_QUEUE', 32))
+LOGO_RENDER_TIMEOUT = float(os.getenv('LOGO_RENDER_TIMEOUT', 20))
+
+# "full" copies the whole template, "band" restores only the name bands of a reusable canvas.
+# Band only wins on large templates, where the copy costs more than measuring the names;
+# compare with LOGO_RENDER_MODE=band python -m utils.logo_bench before switching
+LOGO_RENDER_MODE = os.getenv('LOGO_RENDER_MODE', 'full')
+
+# Logo encoding - the smallest format that meets LOGO_MIN_PSNR and LOGO_MAX_BYTES wins
+LOGO_FORMATS = os.getenv('LOGO_FORMATS', 'png,jpeg').split(',')
+LOGO_PALETTE_COLORS = int(os.getenv('LOGO_PALETTE_COLORS', 256))
+LOGO_PNG_COMPRESS_LEVEL = int(os.getenv('LOGO_PNG_COMPRESS_LEVEL', 6))
+LOGO_JPEG_QUALITY = int(os.getenv('LOGO_JPEG_QUALITY', 90))
+LOGO_WEBP_QUALITY = int(os.getenv('LOGO_WEBP_QUALITY', 90))
+LOGO_MAX_BYTES = int(os.getenv('LOGO_MAX_BYTES', 0))
+LOGO_MIN_PSNR = float(os.getenv('LOGO_MIN_PSNR', 38))
+
+# Rendered logo cache
+LOGO_CACHE_ITEMS = int(os.getenv('LOGO_CACHE_ITEMS', 256))
+LOGO_CACHE_DIR = 'data/logo_cache'
+LOGO_CACHE_DISK_BYTES = int(os.getenv('LOGO_CACHE_DISK_MB', 64)) * 1024 * 1024
+
+# Group and role storage ("sqlite" or legacy "json")
+STORE_BACKEND = os.getenv('STORE_BACKEND', 'sqlite')
+STORE_PATH = os.getenv('STORE_PATH', 'data/escrow.db')
+
+# Seconds between write-behind flushes of bot state
+STATE_FLUSH_INTERVAL = float(os.getenv('STATE_FLUSH_INTERVAL', 1.0))
+
+# Legacy JSON files, imported into SQLite on first start
+GROUPS_FILE = 'data/active_groups.json'
+USER_ROLES_FILE = 'data/user_roles.json'
+
+# Group counter, reserved in blocks of SEQUENCE_BLOCK_SIZE numbers
 COUNTER_FILE = 'data/counter.json'
+SEQUENCE_BLOCK_SIZE = int(os.getenv('SEQUENCE_BLOCK_SIZE', 20))
+
+# Log channel shipping - records arriving within LOG_BATCH_WINDOW share one message
+LOG_QUEUE_MAX = int(os.getenv('LOG_QUEUE_MAX', 200))
+LOG_BATCH_WINDOW = float(os.getenv('LOG_BATCH_WINDOW', 2.0))
+LOG_MAX_RETRIES = int(os.getenv('LOG_MAX_RETRIES', 3))
+LOG_RETRY_DELAY = float(os.getenv('LOG_RETRY_DELAY', 2.0))
+LOG_REPLAY_INTERVAL = float(os.getenv('LOG_REPLAY_INTERVAL', 60))
+LOG_SPOOL_FILE = 'data/log_spool.jsonl'
+
+# Outgoing request scheduling - token bucket per client, FloodWait sat out up to a limit
+SCHEDULER_RATE = float(os.getenv('SCHEDULER_RATE', 25))
+SCHEDULER_BURST = int(os.getenv('SCHEDULER_BURST', 30))
+SCHEDULER_MAX_FLOOD_WAIT = int(os.getenv('SCHEDULER_MAX_FLOOD_WAIT', 60))
+SCHEDULER_INTERACTIVE_MAX_WAIT = int(os.getenv('SCHEDULER_INTERACTIVE_MAX_WAIT', 10))
+
+# Minimum seconds between progress edits of the creation status message
+CREATE_PROGRESS_INTERVAL = float(os.getenv('CREATE_PROGRESS_INTERVAL', 1.0))
+
+# Escrow creations running at once, and how many may wait before clicks are turned away
+CREATE_CONCURRENCY = int(os.getenv('CREATE_CONCURRENCY', 4))
+CREATE_QUEUE_MAX = int(os.getenv('CREATE_QUEUE_MAX', 20))
+
+# Escrows one user may start per window (seconds); 0 disables the limit
+CREATE_USER_LIMIT = int(os.getenv('CREATE_USER_LIMIT', 3))
+CREATE_USER_WINDOW = int(os.getenv('CREATE_USER_WINDOW', 600))
 
-def get_next_number(group_type="p2p"):
-    """Get next sequential group number"""
-    try:
-        if os.path.exists(COUNTER_FILE):
-            with open(COUNTER_FILE, 'r') as f:
-                counter = json.load(f)
-        else:
-            counter = {"p2p": 1, "other": 1}
-        
-        number = counter.get(group_type, 1)
-        counter[group_type] = number + 1
-        
-        with open(COUNTER_FILE, 'w') as f:
-            json.dump(counter, f, indent=2)
-        
-        return number
-    except Exception as e:
-        print(f"Error in get_next_number: {e}")
-        return 1
+# Prometheus metrics endpoint (port 0 disables it)
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', 9464))
 
 def set_bot_username(username):
     """Set bot username globally"""
@@ -2,43 +2,50 @@
 """
 Create escrow handlers - Fixed version
 """
-from telethon.sessions import StringSession
-from telethon.tl import functions, types
 from telethon import Button
-from telethon.tl.types import ChatAdminRights, KeyboardButtonCopy
-from config import STRING_SESSION1, API_ID, API_HASH, set_bot_username, LOG_CHANNEL_ID
-from telethon import TelegramClient
-import asyncio
-import json
-import os
+from telethon.tl.types import KeyboardButtonCopy
+import config
+from config import set_bot_username
+from utils.client_pool import user_pool
+from utils.group_pool import group_pool
+from utils.group_setup import provision_group
+from utils.state import get_state, clean_chat_id
+from utils.sequence import get_next_number
+from utils.log_shipper import log_shipper
+from utils.scheduler import request_lane, NORMAL
+from utils.progress import ProgressMessage
+from utils.job_queue import creation_queue, QueueFull
+from utils.dedup import creation_flights, creation_limiter
+from utils.metrics import CREATE_SECONDS, CREATE_STEP_SECONDS
 from datetime import datetime
+import math
 import time
 
 # Image URLs from config
 OTC_IMAGE = "https://files.catbox.moe/f6lzpr.png"
 P2P_IMAGE = "https://files.catbox.moe/ieiejo.png"
 
-# Define get_next_number locally
-def get_next_number(group_type="p2p"):
-    """Get next sequential group number"""
-    COUNTER_FILE = 'data/counter.json'
-    try:
-        if os.path.exists(COUNTER_FILE):
-            with open(COUNTER_FILE, 'r') as f:
-                counter = json.load(f)
+async def get_bot_username(client):
+    """Bot username cached at startup, looked up once if it is missing"""
+    if not config.BOT_USERNAME:
+        bot = await client.get_me()
+        set_bot_username(bot.username)
+    return config.BOT_USERNAME
+
+def creation_status(deal_type, mention):
+    """Render function for the creation progress message"""
+    from utils.texts import CREATION_PROGRESS_MESSAGE, CREATION_STEPS, CREATION_QUEUED_LINE
+    
+    def render(done, position):
+        if position:
+            steps = CREATION_QUEUED_LINE.format(POSITION=position)
         else:
-            counter = {"p2p": 1, "other": 1}
-        
-        number = counter.get(group_type, 1)
-        counter[group_type] = number + 1
-        
-        with open(COUNTER_FILE, 'w') as f:
-            json.dump(counter, f, indent=2)
-        
-        return number
-    except Exception as e:
-        print(f"[ERROR] get_next_number: {e}")
-        return 1
+            steps = "\n".join(
+                f"{'✅' if name in done else '⏳'} {label}" for name, label in CREATION_STEPS
+            )
+        return CREATION_PROGRESS_MESSAGE.format(DEAL_TYPE=deal_type, MENTION=mention, STEPS=steps)
+    
+    return render
 
 async def handle_create(event):
     """
@@ -57,6 +64,74 @@ async def handle_create(event):
         print(f"[ERROR] create handler: {e}")
         await event.answer("✅ Create escrow menu", alert=False)
 
+async def run_creation(event, user, mention, bot_username, group_type, deal_type, name_prefix):
+    """
+    Create an escrow for a click through the creation queue
+    
+    Repeated clicks by the same user for the same deal type attach to the
+    creation already in flight instead of starting another one.
+    
+    Returns:
+        (group_number, group_name, result), or None when the click was
+        turned away or its message is already showing the outcome
+    """
+    from utils.texts import CREATION_IN_PROGRESS_ALERT, CREATION_RATE_LIMITED_ALERT, CREATION_BUSY_MESSAGE
+    
+    key = (user.id, group_type)
+    flight = creation_flights.get(key)
+    if flight:
+        creation_flights.join(flight)
+        await event.answer(CREATION_IN_PROGRESS_ALERT)
+        try:
+            creation = await flight.wait()
+        except QueueFull:
+            return None
+        # The click that started the flight renders its own message
+        return None if flight.owner == event.message_id else creation
+    
+    allowed, retry_after = creation_limiter.allow(user.id)
+    if not allowed:
+        await event.answer(
+            CREATION_RATE_LIMITED_ALERT.format(MINUTES=math.ceil(retry_after / 60)),
+            alert=True
+        )
+        return None
+    
+    # Status follows the queue and the real creation steps, throttled
+    progress = ProgressMessage(event, creation_status(deal_type, mention))
+    progress.start()
+    
+    async def create():
+        # Numbered inside the flight and only once the job runs,
+        # so duplicate and rejected clicks burn no number
+        group_number = get_next_number(group_type)
+        group_name = f"{name_prefix} 𝘌𝘴𝘤𝘳𝘰𝘸 𝘚𝘦𝘴𝘴𝘪𝘰𝘯 • #{group_number:02d}"
+        started = time.perf_counter()
+        result = await create_escrow_group(group_name, bot_username, group_type, event.client, user.id, progress=progress.step)
+        CREATE_SECONDS.observe(
+            time.perf_counter() - started, group_type=group_type, outcome="ok" if result else "failed"
+        )
+        return group_number, group_name, result
+    
+    async def queued():
+        try:
+            return await creation_queue.run(create, on_position=progress.queued)
+        finally:
+            await progress.close()
+    
+    flight = creation_flights.start(key, queued, owner=event.message_id)
+    try:
+        return await flight.wait()
+    except QueueFull:
+        # Nothing was created, so the click does not count against the user
+        creation_limiter.refund(user.id)
+        await event.edit(
+            CREATION_BUSY_MESSAGE,
+            parse_mode='html',
+            buttons=[Button.inline("🔄 Try Again", b"create")]
+        )
+        return None
+
 async def handle_create_p2p(event):
     """
     Handle P2P deal selection
@@ -68,32 +143,14 @@ async def handle_create_p2p(event):
         if user.username:
             mention = f"@{user.username}"
         
-        # Get bot info
-        bot = await event.client.get_me()
-        bot_username = bot.username
-        set_bot_username(bot_username)
-        
-        # Get group number
-        group_number = get_next_number("p2p")
-        group_name = f"𝖯2𝖯 𝘌𝘴𝘤𝘳𝘰𝘸 𝘚𝘦𝘴𝘴𝘪𝘰𝘯 • #{group_number:02d}"
-        
-        # Show animation messages
-        animation_messages = [
-            f"𝘊𝘳𝘦𝘢𝘵𝘪𝘯𝘨 𝘗2𝘗 𝘌𝘴𝘤𝘳𝘰𝘸\n\n<blockquote>Please wait {mention}.</blockquote>",
-            f"𝘊𝘳𝘦𝘢𝘵𝘪𝘯𝘨 𝘗2𝘗 𝘌𝘴𝘤𝘳𝘰𝘸\n\n<blockquote>Please wait {mention}..</blockquote>",
-            f"𝘊𝘳𝘦𝘢𝘵𝘪𝘯𝘨 𝘗2𝘗 𝘌𝘴𝘤𝘳𝘰𝘸\n\n<blockquote>Please wait {mention}...</blockquote>",
-        ]
-        
-        # Display animation
-        for msg in animation_messages:
-            await event.edit(
-                msg,
-                parse_mode='html'
-            )
-            await asyncio.sleep(0.5)
+        # Bot username resolved once at startup
+        bot_username = await get_bot_username(event.client)
         
-        # Create group
-        result = await create_escrow_group(group_name, bot_username, "p2p", event.client, user.id)
+        # Create group, sharing a creation this user already started
+        creation = await run_creation(event, user, mention, bot_username, "p2p", "𝘗2𝘗", "𝖯2𝖯")
+        if creation is None:
+            return
+        group_number, group_name, result = creation
         
         if result and "invite_url" in result:
             from utils.texts import P2P_CREATED_MESSAGE
@@ -148,32 +205,14 @@ async def handle_create_other(event):
         if user.username:
             mention = f"@{user.username}"
         
-        # Get bot info
-        bot = await event.client.get_me()
-        bot_username = bot.username
-        set_bot_username(bot_username)
+        # Bot username resolved once at startup
+        bot_username = await get_bot_username(event.client)
         
-        # Get group number
-        group_number = get_next_number("other")
-        group_name = f"𝖮𝖳𝖢 𝘌𝘴𝘤𝘳𝘰𝘸 𝘚𝘦𝘴𝘴𝘪𝘰𝘯 • #{group_number:02d}"
-        
-        # Show animation messages
-        animation_messages = [
-            f"𝘊𝘳𝘦𝘢𝘵𝘪𝘯𝘨 𝘖𝘛𝘊 𝘌𝘴𝘤𝘳𝘰𝘸\n\n<blockquote>Please wait {mention}.</blockquote>",
-            f"𝘊𝘳𝘦𝘢𝘵𝘪𝘯𝘨 𝘖𝘛𝘊 𝘌𝘴𝘤𝘳𝘰𝘸\n\n<blockquote>Please wait {mention}..</blockquote>",
-            f"𝘊𝘳𝘦𝘢𝘵𝘪𝘯𝘨 𝘖𝘛𝘊 𝘌𝘴𝘤𝘳𝘰𝘸\n\n<blockquote>Please wait {mention}...</blockquote>",
-        ]
-        
-        # Display animation
-        for msg in animation_messages:
-            await event.edit(
-                msg,
-                parse_mode='html'
-            )
-            await asyncio.sleep(0.5)
-        
-        # Create group
-        result = await create_escrow_group(group_name, bot_username, "other", event.client, user.id)
+        # Create group, sharing a creation this user already started
+        creation = await run_creation(event, user, mention, bot_username, "other", "𝘖𝘛𝘊", "𝖮𝖳𝖢")
+        if creation is None:
+            return
+        group_number, group_name, result = creation
         
         if result and "invite_url" in result:
             from utils.texts import OTHER_CREATED_MESSAGE
@@ -217,137 +256,58 @@ async def handle_create_other(event):
             buttons=[Button.inline("🔄 Try Again", b"create")]
         )
 
-async def create_escrow_group(group_name, bot_username, group_type, bot_client, creator_user_id):
+async def create_escrow_group(group_name, bot_username, group_type, bot_client, creator_user_id, progress=None):
     """
     Create a supergroup
-    """
-    if not STRING_SESSION1:
-        print("[ERROR] STRING_SESSION1 not configured in .env")
-        return None
     
-    user_client = None
+    progress, if given, is called with each completed step name:
+    "created", "admins" and "invite"
+    """
     try:
-        # Start user client
-        user_client = TelegramClient(StringSession(STRING_SESSION1), API_ID, API_HASH)
-        await user_client.start()
-        
-        print(f"[INFO] User client started")
-        
-        # Get bot entity
-        bot_entity = await user_client.get_entity(bot_username)
-        print(f"[INFO] Bot entity: @{bot_username}")
-        
-        # Get creator's entity
-        creator = await user_client.get_me()
-        creator_name = creator.username if creator.username else f"ID:{creator.id}"
-        print(f"[INFO] Creator: @{creator_name}")
-        
-        # Create supergroup
-        print("[STEP 1] Creating supergroup...")
-        created = await user_client(functions.channels.CreateChannelRequest(
-            title=group_name,
-            about=f"🔐 Secure {group_type.upper()} Escrow Group\nEscrowed by @{bot_username}",
-            megagroup=True,
-            broadcast=False
-        ))
-        
-        chat = created.chats[0]
-        chat_id = chat.id
-        channel = types.InputPeerChannel(channel_id=chat.id, access_hash=chat.access_hash)
-        print(f"[SUCCESS] Supergroup created: {chat_id}")
+        # Setup requests yield to button responses but not to background work
+        with request_lane(NORMAL):
+            # Claim a pre-provisioned group when one is ready
+            claim_started = time.perf_counter()
+            setup = await group_pool.claim(group_type, group_name)
+            
+            if setup:
+                CREATE_STEP_SECONDS.observe(time.perf_counter() - claim_started, step="claim", outcome="ok")
+                print(f"[INFO] Claimed pooled group {setup['chat_id']}")
+                # A pooled group arrives with every step already done
+                if progress:
+                    for step in ("created", "admins", "invite"):
+                        progress(step)
+            else:
+                if not user_pool.members:
+                    print("[ERROR] No STRING_SESSION configured in .env")
+                    return None
+                
+                async with user_pool.acquire() as member:
+                    setup = await provision_group(member, group_name, bot_username, group_type, progress)
         
-        # Promote creator as anonymous admin
-        print("[STEP 2] Promoting creator as anonymous admin...")
-        try:
-            await user_client(functions.channels.EditAdminRequest(
-                channel=channel,
-                user_id=creator,
-                admin_rights=ChatAdminRights(
-                    change_info=True,
-                    post_messages=True,
-                    edit_messages=True,
-                    delete_messages=True,
-                    ban_users=True,
-                    invite_users=True,
-                    pin_messages=True,
-                    add_admins=True,
-                    anonymous=True,
-                    manage_call=True,
-                    other=True
-                ),
-                rank="Owner"
-            ))
-            print("[SUCCESS] Creator promoted")
-        except Exception as e:
-            print(f"[ERROR] Promote creator: {e}")
+        if not setup:
             return None
         
-        # Add and promote bot
-        print("[STEP 3] Adding bot...")
-        await user_client(functions.channels.InviteToChannelRequest(
-            channel=channel,
-            users=[bot_entity]
-        ))
-        
-        await user_client(functions.channels.EditAdminRequest(
-            channel=channel,
-            user_id=bot_entity,
-            admin_rights=ChatAdminRights(
-                change_info=True,
-                post_messages=True,
-                edit_messages=True,
-                delete_messages=True,
-                ban_users=True,
-                invite_users=True,
-                pin_messages=True,
-                add_admins=False,
-                anonymous=False,
-                manage_call=True,
-                other=True
-            ),
-            rank="Escrow Bot"
-        ))
-        print("[SUCCESS] Bot added")
-        
-        # Send welcome message
-        print("[STEP 4] Sending welcome message...")
-        from utils.texts import WELCOME_MESSAGE
-        welcome_msg = WELCOME_MESSAGE.format(bot_username=bot_username)
-        
-        sent_message = await user_client.send_message(
-            channel,
-            welcome_msg,
-            parse_mode='html'
-        )
-        
-        # Pin the welcome message
-        await user_client.pin_message(channel, sent_message, notify=False)
-        print("[SUCCESS] Welcome pinned")
-        
-        # Create invite link
-        print("[STEP 5] Creating invite...")
-        invite_link = await user_client(functions.messages.ExportChatInviteRequest(
-            peer=channel
-        ))
-        invite_url = str(invite_link.link)
-        
-        print("[COMPLETE] Group setup done")
+        chat_id = setup["chat_id"]
+        invite_url = setup["invite_url"]
+        creator_name = setup["creator_username"]
+        member = user_pool.get(setup["session"])
         
         # Store group data
-        store_group_data(chat_id, group_name, group_type, creator.id, bot_username, creator_name, creator_user_id)
+        store_group_data(
+            chat_id, group_name, group_type, setup["creator_id"], bot_username, creator_name, creator_user_id,
+            # Pool entries saved before the flag existed always had the welcome pinned
+            welcome_pinned=setup.get("welcome_pinned", True)
+        )
         
-        # Send log to channel (optional - skip if fails)
-        try:
-            await send_log_to_channel(user_client, group_name, group_type, creator, chat_id, invite_url, creator_user_id)
-        except Exception as log_error:
-            print(f"[WARNING] Log failed: {log_error}")
-            # Continue even if log fails
+        # Hand the channel log to the background shipper
+        queue_creation_log(member.creator, group_name, group_type, chat_id, invite_url, creator_user_id)
         
         return {
             "group_id": chat_id,
             "invite_url": invite_url,
             "group_name": group_name,
-            "creator_id": creator.id,
+            "creator_id": setup["creator_id"],
             "creator_user_id": creator_user_id,
             "creator_username": creator_name,
             "bot_username": bot_username,
@@ -359,14 +319,9 @@ async def create_escrow_group(group_name, bot_username, group_type, bot_client,
         import traceback
         traceback.print_exc()
         return None
-        
-    finally:
-        if user_client and user_client.is_connected():
-            await user_client.disconnect()
-            print("[INFO] User client disconnected")
 
-async def send_log_to_channel(user_client, group_name, group_type, creator, chat_id, invite_url, creator_user_id):
-    """Send creation log to channel"""
+def queue_creation_log(creator, group_name, group_type, chat_id, invite_url, creator_user_id):
+    """Queue the creation log for the log channel"""
     try:
         from utils.texts import CHANNEL_LOG_CREATION
         
@@ -398,66 +353,16 @@ async def send_log_to_channel(user_client, group_name, group_type, creator, chat
             group_invite_link=invite_url
         )
         
-        # Send to log channel - FIXED METHOD
-        try:
-            # Method 1: Try with get_entity
-            entity = await user_client.get_entity(LOG_CHANNEL_ID)
-            await user_client.send_message(
-                entity,
-                log_message,
-                parse_mode='html'
-            )
-            print(f"[LOG] Sent to channel")
-            
-        except Exception as e:
-            print(f"[WARNING] Channel log method 1 failed: {e}")
-            
-            # Method 2: Try with input peer
-            try:
-                from telethon.tl.types import InputPeerChannel
-                # Remove -100 prefix if present
-                channel_id = abs(LOG_CHANNEL_ID)
-                if str(LOG_CHANNEL_ID).startswith('-100'):
-                    channel_id = int(str(LOG_CHANNEL_ID)[4:])
-                
-                # You need the access hash - try to get it
-                try:
-                    channel_entity = await user_client.get_entity(LOG_CHANNEL_ID)
-                    input_channel = InputPeerChannel(
-                        channel_id=channel_entity.id,
-                        access_hash=channel_entity.access_hash
-                    )
-                    await user_client.send_message(
-                        input_channel,
-                        log_message,
-                        parse_mode='html'
-                    )
-                    print(f"[LOG] Sent via InputPeerChannel")
-                except:
-                    print(f"[WARNING] Could not get channel access hash")
-                    
-            except Exception as e2:
-                print(f"[ERROR] Channel log all methods failed: {e2}")
+        # Delivery, batching and retries happen off the request path
+        log_shipper.submit(log_message)
         
     except Exception as e:
         print(f"[ERROR] Preparing log: {e}")
 
-def store_group_data(group_id, group_name, group_type, creator_id, bot_username, creator_username, creator_user_id):
+def store_group_data(group_id, group_name, group_type, creator_id, bot_username, creator_username, creator_user_id, welcome_pinned=True):
     """Store group data"""
     try:
-        GROUPS_FILE = 'data/active_groups.json'
-        groups = {}
-        
-        if os.path.exists(GROUPS_FILE):
-            with open(GROUPS_FILE, 'r') as f:
-                groups = json.load(f)
-        
-        # Clean group ID
-        clean_group_id = str(group_id)
-        if clean_group_id.startswith('-100'):
-            clean_group_id = clean_group_id[4:]
-        
-        groups[clean_group_id] = {
+        get_state().put_group(clean_chat_id(group_id), {
             "name": group_name,
             "type": group_type,
             "creator_id": creator_id,
@@ -466,14 +371,11 @@ def store_group_data(group_id, group_name, group_type, creator_id, bot_username,
             "bot_username": bot_username,
             "original_id": str(group_id),
             "members": [],
-            "welcome_pinned": True,
+            "welcome_pinned": welcome_pinned,
             "session_initiated": False,
             "created_at": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
             "created_timestamp": time.time()
-        }
-        
-        with open(GROUPS_FILE, 'w') as f:
-            json.dump(groups, f, indent=2)
+        })
             
         print(f"[INFO] Group data stored")
         
@@ -4,15 +4,15 @@ Main entry point for the Escrow Bot - Fixed version
 """
 import asyncio
 import logging
+import signal
 import sys
-from telethon import TelegramClient, events
-import json
+from telethon import events
 import os
 import time
 import re
 
 # Import configuration
-from config import API_ID, API_HASH, BOT_TOKEN, BOT_USERNAME
+from config import API_ID, API_HASH, BOT_TOKEN, BOT_USERNAME, set_bot_username
 
 # Import handlers
 from handlers.start import handle_start
@@ -28,6 +28,17 @@ from utils.texts import (
     SESSION_ALREADY_INITIATED_MESSAGE, GROUP_NOT_FOUND_MESSAGE
 )
 from utils.buttons import get_main_menu_buttons, get_session_buttons
+from utils.client_pool import user_pool
+from utils.group_pool import group_pool
+from utils.log_shipper import log_shipper
+from utils.state import get_state
+from utils.actors import group_actors
+from utils.render_service import logo_renderer
+from utils.cleaner import service_cleaner
+from utils.deleter import message_deleter
+from utils.router import CallbackRouter
+from utils.scheduler import ScheduledClient, request_lane, INTERACTIVE
+from utils.metrics import metrics_server, HANDLER_SECONDS
 
 # Setup logging
 logging.basicConfig(
@@ -36,36 +47,6 @@ logging.basicConfig(
     datefmt='%H:%M:%S'
 )
 
-# Track groups for invite management
-GROUPS_FILE = 'data/active_groups.json'
-USER_ROLES_FILE = 'data/user_roles.json'
-
-def load_groups():
-    """Load active groups data"""
-    if os.path.exists(GROUPS_FILE):
-        with open(GROUPS_FILE, 'r') as f:
-            return json.load(f)
-    return {}
-
-def save_groups(groups):
-    """Save active groups data"""
-    os.makedirs('data', exist_ok=True)
-    with open(GROUPS_FILE, 'w') as f:
-        json.dump(groups, f, indent=2)
-
-def load_user_roles():
-    """Load user roles data"""
-    if os.path.exists(USER_ROLES_FILE):
-        with open(USER_ROLES_FILE, 'r') as f:
-            return json.load(f)
-    return {}
-
-def save_user_roles(roles):
-    """Save user roles data"""
-    os.makedirs('data', exist_ok=True)
-    with open(USER_ROLES_FILE, 'w') as f:
-        json.dump(roles, f, indent=2)
-
 def get_user_display(user_obj):
     """Get clean display name for user"""
     if hasattr(user_obj, 'username') and user_obj.username:
@@ -79,7 +60,11 @@ def get_user_display(user_obj):
 
 class EscrowBot:
     def __init__(self):
-        self.client = TelegramClient('escrow_bot', API_ID, API_HASH)
+        self.client = ScheduledClient('escrow_bot', API_ID, API_HASH, label="bot")
+        self.router = CallbackRouter()
+        self._run_task = None
+        self._stop_task = None
+        self._stopping = False
         self.setup_handlers()
     
     def setup_handlers(self):
@@ -87,78 +72,39 @@ class EscrowBot:
         
         @self.client.on(events.NewMessage(pattern='/start'))
         async def start_handler(event):
-            await handle_start(event)
-        
-        @self.client.on(events.CallbackQuery(pattern=b'create'))
-        async def create_handler(event):
-            await handle_create(event)
-        
-        @self.client.on(events.CallbackQuery(pattern=b'create_p2p'))
-        async def create_p2p_handler(event):
-            await handle_create_p2p(event)
+            with request_lane(INTERACTIVE), HANDLER_SECONDS.time(handler="start"):
+                await handle_start(event)
         
-        @self.client.on(events.CallbackQuery(pattern=b'create_other'))
-        async def create_other_handler(event):
-            await handle_create_other(event)
-        
-        @self.client.on(events.CallbackQuery(pattern=b'stats'))
-        async def stats_handler(event):
-            await handle_stats(event)
-        
-        @self.client.on(events.CallbackQuery(pattern=b'about'))
-        async def about_handler(event):
-            await handle_about(event)
-        
-        @self.client.on(events.CallbackQuery(pattern=b'help'))
-        async def help_handler(event):
-            await handle_help(event)
-        
-        @self.client.on(events.CallbackQuery(pattern=b'back_to_main'))
-        async def back_handler(event):
-            try:
-                await event.edit(
-                    START_MESSAGE,
-                    buttons=get_main_menu_buttons(),
-                    parse_mode='html'
-                )
-            except Exception as e:
-                await event.answer("❌ An error occurred.", alert=True)
+        # One dispatcher for every inline button
+        self.router.add("create", handle_create)
+        self.router.add("create_p2p", handle_create_p2p)
+        self.router.add("create_other", handle_create_other)
+        self.router.add("stats", handle_stats)
+        self.router.add("about", handle_about)
+        self.router.add("help", handle_help)
+        self.router.add("back_to_main", self.handle_back_to_main)
+        self.router.add("role", self.handle_role_selection, args=2)
+        self.router.register(self.client)
         
         # Handle /begin command
         @self.client.on(events.NewMessage(pattern='/begin'))
         async def begin_handler(event):
-            await self.handle_begin_command(event)
-        
-        # Handle role selection
-        @self.client.on(events.CallbackQuery(pattern=rb'role_'))
-        async def role_handler(event):
-            await self.handle_role_selection(event)
+            with request_lane(INTERACTIVE), HANDLER_SECONDS.time(handler="begin"):
+                await self.handle_begin_command(event)
         
-        # Delete system messages only
-        @self.client.on(events.NewMessage)
-        async def handle_all_messages(event):
-            """Delete system messages only"""
-            try:
-                message_text = event.text or ""
-                
-                # Check if system message
-                is_system = False
-                if event.sender_id == 777000 or event.sender_id == 1087968824:
-                    is_system = True
-                elif any(pattern in message_text.lower() for pattern in [
-                    "joined the group", "was added", "created the group", 
-                    "left the group", "pinned a message"
-                ]):
-                    is_system = True
-                
-                if is_system:
-                    try:
-                        await event.delete()
-                    except:
-                        pass
-                    
-            except:
-                pass
+        # Delete service messages in escrow groups only
+        service_cleaner.register(self.client)
+    
+    async def handle_back_to_main(self, event):
+        """Handle back button click"""
+        try:
+            await event.edit(
+                START_MESSAGE,
+                buttons=get_main_menu_buttons(),
+                parse_mode='html'
+            )
+        except Exception as e:
+            await event.answer("❌ An error occurred.", alert=True)
     
     async def handle_begin_command(self, event):
         """Handle /begin command"""
@@ -169,30 +115,8 @@ class EscrowBot:
             chat_id = str(chat.id)
             chat_title = getattr(chat, 'title', 'Unknown')
             
-            # Clean chat ID
-            if chat_id.startswith('-100'):
-                clean_chat_id = chat_id[4:]
-            else:
-                clean_chat_id = chat_id
-            
-            # Load groups
-            groups = load_groups()
-            group_data = None
-            group_key = None
-            
-            # Find group
-            if clean_chat_id in groups:
-                group_data = groups[clean_chat_id]
-                group_key = clean_chat_id
-            elif chat_id in groups:
-                group_data = groups[chat_id]
-                group_key = chat_id
-            else:
-                for key, data in groups.items():
-                    if data.get("name") == chat_title:
-                        group_data = data
-                        group_key = key
-                        break
+            # Find group by chat id, then title
+            group_key, group_data = get_state().find_group(chat_id, chat_title)
             
             if not group_data:
                 try:
@@ -201,87 +125,93 @@ class EscrowBot:
                     pass
                 return
             
-            # Check if already initiated
-            if group_data.get("session_initiated", False):
+            # One /begin at a time per group
+            await group_actors.run(group_key, self.initiate_session, event, chat, group_key, chat_title)
+                
+        except Exception as e:
+            print(f"[ERROR] Handling /begin: {e}")
+    
+    async def initiate_session(self, event, chat, group_key, chat_title):
+        """Start the role selection session (runs on the group's actor)"""
+        state = get_state()
+        group_data = state.get_group(group_key)
+        
+        # Check if already initiated
+        if group_data.get("session_initiated", False):
+            try:
+                await event.reply(SESSION_ALREADY_INITIATED_MESSAGE, parse_mode='html')
+            except:
+                pass
+            return
+        
+        # Get participants (EXCLUDE CREATOR)
+        try:
+            participants = await self.client.get_participants(chat)
+            real_users = []
+            
+            creator_user_id = group_data.get("creator_user_id")
+            
+            for participant in participants:
+                # Skip bots
+                if hasattr(participant, 'bot') and participant.bot:
+                    continue
+                
+                # Skip creator
+                if creator_user_id and participant.id == creator_user_id:
+                    continue
+                
+                real_users.append(participant)
+            
+            member_count = len(real_users)
+            print(f"[BEGIN] Found {member_count} real users (excluding creator)")
+            
+            # Need exactly 2 users
+            if member_count < 2:
                 try:
-                    await event.reply(SESSION_ALREADY_INITIATED_MESSAGE, parse_mode='html')
+                    message = INSUFFICIENT_MEMBERS_MESSAGE.format(current_count=member_count)
+                    await event.reply(message, parse_mode='html')
                 except:
                     pass
                 return
             
-            # Get participants (EXCLUDE CREATOR)
-            try:
-                participants = await self.client.get_participants(chat)
-                real_users = []
-                
-                creator_user_id = group_data.get("creator_user_id")
-                
-                for participant in participants:
-                    # Skip bots
-                    if hasattr(participant, 'bot') and participant.bot:
-                        continue
-                    
-                    # Skip creator
-                    if creator_user_id and participant.id == creator_user_id:
-                        continue
-                    
-                    real_users.append(participant)
-                
-                member_count = len(real_users)
-                print(f"[BEGIN] Found {member_count} real users (excluding creator)")
-                
-                # Need exactly 2 users
-                if member_count < 2:
-                    try:
-                        message = INSUFFICIENT_MEMBERS_MESSAGE.format(current_count=member_count)
-                        await event.reply(message, parse_mode='html')
-                    except:
-                        pass
-                    return
-                
-                # Update members
-                group_data["members"] = [u.id for u in real_users]
-                groups[group_key] = group_data
-                save_groups(groups)
-                
-                # Get user displays
-                user_displays = []
-                for user_obj in real_users[:2]:
-                    user_displays.append(get_user_display(user_obj))
-                
-                display_text = " • ".join(user_displays)
-                
-                # Send session message
-                message = SESSION_INITIATED_MESSAGE.format(
-                    participants_display=display_text
-                )
-                
-                # Get buttons from buttons.py
-                buttons = get_session_buttons(group_key)
-                
-                # Send message
-                sent_message = await self.client.send_message(
-                    chat,
-                    message,
-                    parse_mode='html',
-                    buttons=buttons
-                )
-                
-                # Update group
-                group_data["session_initiated"] = True
-                group_data["session_message_id"] = sent_message.id
-                groups[group_key] = group_data
-                save_groups(groups)
-                
-                print(f"[SUCCESS] Session initiated in {chat_title}")
-                
-            except Exception as e:
-                print(f"[ERROR] /begin: {e}")
-                
+            # Update members
+            group_data["members"] = [u.id for u in real_users]
+            state.put_group(group_key, group_data)
+            
+            # Get user displays
+            user_displays = []
+            for user_obj in real_users[:2]:
+                user_displays.append(get_user_display(user_obj))
+            
+            display_text = " • ".join(user_displays)
+            
+            # Send session message
+            message = SESSION_INITIATED_MESSAGE.format(
+                participants_display=display_text
+            )
+            
+            # Get buttons from buttons.py
+            buttons = get_session_buttons(group_key)
+            
+            # Send message
+            sent_message = await self.client.send_message(
+                chat,
+                message,
+                parse_mode='html',
+                buttons=buttons
+            )
+            
+            # Update group
+            group_data["session_initiated"] = True
+            group_data["session_message_id"] = sent_message.id
+            state.put_group(group_key, group_data)
+            
+            print(f"[SUCCESS] Session initiated in {chat_title}")
+            
         except Exception as e:
-            print(f"[ERROR] Handling /begin: {e}")
+            print(f"[ERROR] /begin: {e}")
     
-    async def handle_role_selection(self, event):
+    async def handle_role_selection(self, event, role=None, group_id=None):
         """Handle role selection"""
         try:
             # Get user
@@ -290,71 +220,38 @@ class EscrowBot:
                 await event.answer("❌ Cannot identify user", alert=True)
                 return
             
-            # Get data
-            data = event.data.decode('utf-8')
-            
-            # Get chat
-            chat = await event.get_chat()
-            chat_id = str(chat.id)
-            chat_title = getattr(chat, 'title', 'Unknown')
-            
-            # Clean chat ID
-            if chat_id.startswith('-100'):
-                clean_chat_id = chat_id[4:]
-            else:
-                clean_chat_id = chat_id
-            
-            # Parse role
-            if data.startswith('role_buyer_'):
-                role = "buyer"
+            # Role and group come parsed from the callback data
+            if role == "buyer":
                 role_name = "Buyer"
-                group_id = data.replace('role_buyer_', '')
-            elif data.startswith('role_seller_'):
-                role = "seller"
+            elif role == "seller":
                 role_name = "Seller"
-                group_id = data.replace('role_seller_', '')
             else:
                 return
             
-            # Load data
-            groups = load_groups()
-            roles = load_user_roles()
+            # Get chat
+            chat = await event.get_chat()
+            chat_title = getattr(chat, 'title', 'Unknown')
             
-            # Find group
-            if group_id not in groups:
-                for key, data in groups.items():
-                    if data.get("name") == chat_title:
-                        group_id = key
-                        break
+            # Find group by button key, then title
+            group_id, group_data = get_state().find_group(group_id, chat_title)
             
-            if group_id not in groups:
+            if not group_data:
                 await event.answer("❌ Group not found", alert=True)
                 return
             
-            # Initialize roles
-            if group_id not in roles:
-                roles[group_id] = {}
+            # Check and assign on the group's actor so clicks are linearized
+            status, roles, complete = await group_actors.run(
+                group_id, self.assign_role, group_id, sender, role
+            )
             
-            # Check if already chosen
-            if str(sender.id) in roles[group_id]:
+            if status == "chosen":
                 await event.answer("⛔ Role Already Chosen", alert=True)
                 return
             
-            # Check if role taken
-            role_taken = any(u.get("role") == role for u in roles[group_id].values())
-            if role_taken:
+            if status == "taken":
                 await event.answer("⚠️ Role Already Taken", alert=True)
                 return
             
-            # Save role
-            roles[group_id][str(sender.id)] = {
-                "role": role,
-                "name": get_user_display(sender),
-                "user_id": sender.id,
-                "selected_at": time.time()
-            }
-            save_user_roles(roles)
-            
             # Send success
             await event.answer(f"✅ {role_name} role selected", alert=False)
             
@@ -372,17 +269,58 @@ class EscrowBot:
             
             print(f"[ROLE] {get_user_display(sender)} selected as {role_name}")
             
-            # Check if both roles selected
-            buyer_count = sum(1 for u in roles[group_id].values() if u.get("role") == "buyer")
-            seller_count = sum(1 for u in roles[group_id].values() if u.get("role") == "seller")
-            
-            if buyer_count >= 1 and seller_count >= 1:
-                await self.send_wallet_setup(chat, group_id, roles[group_id])
+            # Only the click that completed both roles starts the setup
+            if complete:
+                await self.send_wallet_setup(chat, group_id, roles)
                 
         except Exception as e:
             print(f"[ERROR] Role selection: {e}")
             await event.answer("❌ Error selecting role", alert=True)
     
+    async def assign_role(self, group_id, sender, role):
+        """
+        Check and record a role choice (runs on the group's actor)
+        
+        Returns:
+            tuple: (status, roles, complete) where status is "chosen",
+            "taken" or "ok" and complete is True for the one assignment
+            that fills both roles
+        """
+        state = get_state()
+        roles = state.get_roles(group_id)
+        
+        # Check if already chosen
+        if str(sender.id) in roles:
+            return "chosen", roles, False
+        
+        # Check if role taken
+        if any(u.get("role") == role for u in roles.values()):
+            return "taken", roles, False
+        
+        # Save role
+        roles[str(sender.id)] = {
+            "role": role,
+            "name": get_user_display(sender),
+            "user_id": sender.id,
+            "selected_at": time.time()
+        }
+        state.put_role(group_id, sender.id, roles[str(sender.id)])
+        
+        # Check if both roles selected
+        buyer_count = sum(1 for u in roles.values() if u.get("role") == "buyer")
+        seller_count = sum(1 for u in roles.values() if u.get("role") == "seller")
+        
+        group_data = state.get_group(group_id)
+        complete = (
+            buyer_count >= 1 and seller_count >= 1
+            and not group_data.get("wallet_setup_started", False)
+        )
+        if complete:
+            group_data["wallet_setup_started"] = True
+            state.put_group(group_id, group_data)
+        
+        return "ok", roles, complete
+    
     async def send_wallet_setup(self, chat, group_id, user_roles):
         """Send wallet setup message and update group photo"""
         try:
@@ -399,19 +337,18 @@ class EscrowBot:
             if not buyer or not seller:
                 return
             
-            # Generate custom logo
-            from utils.logo_generator import LogoGenerator
-            
             # Get group type from stored data
-            groups = load_groups()
-            group_data = groups.get(group_id, {})
+            group_data = get_state().get_group(group_id) or {}
             group_type = group_data.get("type", "p2p")
             
-            generator = LogoGenerator(group_type=group_type)
-            success, image_bytes, message = generator.generate_logo(
+            # Generate custom logo in the render workers
+            success, image_bytes, message = await logo_renderer.render_logo(
+                group_type,
                 buyer['name'],
                 seller['name']
             )
+            if not success:
+                print(f"[WARNING] {message}")
             
             if success:
                 try:
@@ -426,9 +363,10 @@ class EscrowBot:
                     print(f"[WARNING] Could not update group photo: {e}")
                     # Save logo to file for debugging
                     try:
-                        with open(f"debug_{group_type}_logo.png", "wb") as f:
+                        debug_path = f"debug_{group_type}_{image_bytes.name}"
+                        with open(debug_path, "wb") as f:
                             f.write(image_bytes.getvalue())
-                        print(f"[DEBUG] Logo saved as debug_{group_type}_logo.png")
+                        print(f"[DEBUG] Logo saved as {debug_path}")
                     except:
                         pass
             
@@ -458,8 +396,35 @@ class EscrowBot:
         except Exception as e:
             print(f"[ERROR] Sending setup: {e}")
 
+    def request_stop(self, signum=None):
+        """Leave run() through its shutdown path"""
+        if self._stopping:
+            # Already stopping - let the shutdown finish
+            return
+        self._stopping = True
+        print(f"\n👋 Stopping ({signal.Signals(signum).name if signum else 'requested'})...")
+        if self.client.is_connected():
+            # run_until_disconnected returns and the finally block flushes state
+            self._stop_task = asyncio.ensure_future(self.client.disconnect())
+            return
+        if self._run_task and not self._run_task.done():
+            # Still starting up - abort, the finally block still runs
+            self._run_task.cancel()
+
+    def install_signal_handlers(self):
+        """Route Ctrl+C and SIGTERM through request_stop instead of KeyboardInterrupt"""
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signum, self.request_stop, signum)
+            except (NotImplementedError, RuntimeError):
+                # No loop signal support (e.g. Windows); KeyboardInterrupt still applies
+                pass
+
     async def run(self):
         """Run the bot"""
+        self._run_task = asyncio.current_task()
+        self.install_signal_handlers()
         try:
             print("═"*50)
             print("🔐 SECURE ESCROW BOT")
@@ -470,11 +435,30 @@ class EscrowBot:
                 print("❌ Missing configuration")
                 sys.exit(1)
             
+            # Load state and build lookup indexes
+            get_state()
+            
+            # Local Prometheus endpoint
+            await metrics_server.start()
+            
+            # Spawn logo render workers before any network threads start
+            logo_renderer.start()
+            
             # Start client
             await self.client.start(bot_token=BOT_TOKEN)
             
             # Get bot info
             me = await self.client.get_me()
+            set_bot_username(me.username)
+            
+            # Connect user sessions once for all creations
+            await user_pool.start(me.username)
+            
+            # Ship channel logs in the background, replaying any spooled ones
+            log_shipper.start()
+            
+            # Keep pre-provisioned groups ready for instant creation
+            await group_pool.start(me.username)
             
             print(f"✅ Bot: @{me.username}")
             print(f"🆔 ID: {me.id}")
@@ -493,11 +477,18 @@ class EscrowBot:
             # Run
             await self.client.run_until_disconnected()
             
-        except KeyboardInterrupt:
+        except (KeyboardInterrupt, asyncio.CancelledError):
             print("\n👋 Bot stopped")
         except Exception as e:
             print(f"\n❌ Error: {e}")
         finally:
+            await message_deleter.flush_all()
+            await group_pool.stop()
+            await log_shipper.stop()
+            await user_pool.stop()
+            logo_renderer.stop()
+            await get_state().close()
+            await metrics_server.stop()
             print("\n🔴 Shutdown complete")
 
 def main():
@@ -0,0 +1,78 @@
+import asyncio
+import pytest
+from utils.actors import GroupActors
+
+
+def test_concurrent_buyer_clicks_are_linearized():
+    async def main():
+        actors = GroupActors()
+        roles = {}
+        wallet_setups = []
+
+        async def assign(user_id, role):
+            # Check-then-set with a suspension point, like the real role handler
+            if any(r == role for r in roles.values()):
+                return "taken", False
+            await asyncio.sleep(0)
+            roles[user_id] = role
+            complete = "buyer" in roles.values() and "seller" in roles.values() and not wallet_setups
+            if complete:
+                wallet_setups.append(dict(roles))
+            return "ok", complete
+
+        results = await asyncio.gather(
+            actors.run("g", assign, 1, "buyer"),
+            actors.run("g", assign, 2, "buyer"),
+            actors.run("g", assign, 3, "seller"),
+        )
+        return actors, results, wallet_setups
+
+    actors, results, wallet_setups = asyncio.run(main())
+    buyer_statuses = sorted(status for status, _ in results[:2])
+    assert buyer_statuses == ["ok", "taken"]
+    assert results[2] == ("ok", True)
+    assert len(wallet_setups) == 1
+    assert actors.active == 0
+
+
+def test_cancelled_job_wakes_caller_and_retires_mailbox():
+    async def main():
+        actors = GroupActors()
+
+        async def cut_off():
+            raise asyncio.CancelledError()
+
+        async def ok():
+            return "ok"
+
+        failed = asyncio.ensure_future(actors.run("g", cut_off))
+        after = asyncio.ensure_future(actors.run("g", ok))
+        with pytest.raises(asyncio.CancelledError):
+            await asyncio.wait_for(failed, timeout=1)
+        assert await asyncio.wait_for(after, timeout=1) == "ok"
+        await asyncio.sleep(0)
+        assert actors.active == 0
+
+        # A later job for the same group gets a fresh, drained mailbox
+        assert await asyncio.wait_for(actors.run("g", ok), timeout=1) == "ok"
+        return actors
+
+    actors = asyncio.run(main())
+    assert actors.active == 0
+
+
+def test_job_error_is_raised_to_its_caller_only():
+    async def main():
+        actors = GroupActors()
+
+        async def boom():
+            raise RuntimeError("failed")
+
+        async def ok():
+            return 1
+
+        return await asyncio.gather(actors.run("g", boom), actors.run("g", ok), return_exceptions=True)
+
+    first, second = asyncio.run(main())
+    assert isinstance(first, RuntimeError)
+    assert second == 1
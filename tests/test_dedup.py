@@ -0,0 +1,68 @@
+import asyncio
+from utils.dedup import SingleFlight, RateLimiter
+
+
+def test_duplicate_callers_share_one_call():
+    async def main():
+        flights = SingleFlight()
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "done"
+
+        flight = flights.start("user:p2p", work)
+        assert flights.get("user:p2p") is flight
+        duplicate = flights.join(flights.get("user:p2p"))
+        results = await asyncio.gather(flight.wait(), duplicate.wait())
+        await asyncio.sleep(0)
+        return flights, calls, results
+
+    flights, calls, results = asyncio.run(main())
+    assert calls == [1]
+    assert results == ["done", "done"]
+    assert flights.get("user:p2p") is None
+    assert flights.stats() == {"in_flight": 0, "started": 1, "joined": 1}
+
+
+def test_cancelled_waiter_does_not_cancel_flight():
+    async def main():
+        flights = SingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.01)
+            return 42
+
+        flight = flights.start("key", work)
+        waiter = asyncio.create_task(flight.wait())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        return await flight.task
+
+    assert asyncio.run(main()) == 42
+
+
+def test_rate_limiter_window(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("utils.dedup.time.monotonic", lambda: now[0])
+    limiter = RateLimiter(limit=2, window=60)
+
+    assert limiter.allow("u") == (True, 0)
+    assert limiter.allow("u") == (True, 0)
+    allowed, retry_after = limiter.allow("u")
+    assert not allowed and retry_after == 60
+    assert limiter.allow("other") == (True, 0)
+
+    now[0] += 60
+    assert limiter.allow("u") == (True, 0)
+
+
+def test_refund_returns_the_event(monkeypatch):
+    monkeypatch.setattr("utils.dedup.time.monotonic", lambda: 100.0)
+    limiter = RateLimiter(limit=1, window=60)
+
+    assert limiter.allow("u") == (True, 0)
+    limiter.refund("u")
+    assert limiter.allow("u") == (True, 0)
+    assert limiter.allow("u")[0] is False
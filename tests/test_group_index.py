@@ -0,0 +1,39 @@
+from utils.state import GroupIndex
+
+
+def test_lookup_by_chat_id_with_and_without_prefix():
+    index = GroupIndex()
+    index.add("-1001234", {"name": "P2P #1"})
+    assert index.lookup(chat_id="1234") == ("-1001234", None)
+    assert index.lookup(chat_id=-1001234) == ("-1001234", None)
+
+
+def test_lookup_by_original_id_and_title():
+    index = GroupIndex()
+    index.add("-1005", {"name": "P2P #5", "original_id": "777"})
+    assert index.lookup(chat_id="777") == ("-1005", None)
+    assert index.lookup(title="P2P #5") == ("-1005", None)
+
+
+def test_ambiguous_title_returns_matches():
+    index = GroupIndex()
+    index.add("-1001", {"name": "Same"})
+    index.add("-1002", {"name": "Same"})
+    assert index.lookup(title="Same") == (None, ["-1001", "-1002"])
+
+
+def test_readd_replaces_old_entries():
+    index = GroupIndex()
+    index.add("-1001", {"name": "Old", "original_id": "9"})
+    index.add("-1001", {"name": "New"})
+    assert index.lookup(title="Old") == (None, None)
+    assert index.lookup(chat_id="9") == (None, None)
+    assert index.lookup(title="New") == ("-1001", None)
+
+
+def test_remove():
+    index = GroupIndex()
+    index.add("-1001", {"name": "Gone"})
+    index.remove("-1001")
+    assert index.lookup(chat_id="1") == (None, None)
+    assert index.by_title == {}
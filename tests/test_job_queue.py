@@ -0,0 +1,118 @@
+import asyncio
+import pytest
+from utils.job_queue import JobQueue, QueueFull
+
+
+def test_rejects_beyond_max_depth():
+    async def main():
+        queue = JobQueue("test", concurrency=1, max_depth=1)
+        gate = asyncio.Event()
+        running = asyncio.create_task(queue.run(gate.wait))
+        await asyncio.sleep(0)
+        waiting = asyncio.create_task(queue.run(gate.wait))
+        await asyncio.sleep(0)
+
+        with pytest.raises(QueueFull):
+            await queue.run(gate.wait)
+
+        gate.set()
+        await asyncio.gather(running, waiting)
+        return queue
+
+    queue = asyncio.run(main())
+    assert queue.rejected == 1
+    assert queue.completed == 2
+    assert queue.running == 0 and queue.depth == 0
+
+
+def test_positions_reported_fifo():
+    async def main():
+        queue = JobQueue("test", concurrency=1, max_depth=5)
+        gate = asyncio.Event()
+        positions = {"a": [], "b": []}
+        first = asyncio.create_task(queue.run(gate.wait))
+        await asyncio.sleep(0)
+        a = asyncio.create_task(queue.run(gate.wait, on_position=positions["a"].append))
+        await asyncio.sleep(0)
+        b = asyncio.create_task(queue.run(gate.wait, on_position=positions["b"].append))
+        await asyncio.sleep(0)
+        gate.set()
+        await asyncio.gather(first, a, b)
+        return positions
+
+    positions = asyncio.run(main())
+    assert positions["a"] == [1, 0]
+    assert positions["b"] == [2, 1, 0]
+
+
+def test_cancelled_waiter_frees_its_place():
+    async def main():
+        queue = JobQueue("test", concurrency=1, max_depth=1)
+        gate = asyncio.Event()
+        running = asyncio.create_task(queue.run(gate.wait))
+        await asyncio.sleep(0)
+        waiting = asyncio.create_task(queue.run(gate.wait))
+        await asyncio.sleep(0)
+
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        assert queue.depth == 0
+
+        # The freed place accepts a new job
+        replacement = asyncio.create_task(queue.run(gate.wait))
+        await asyncio.sleep(0)
+        gate.set()
+        await asyncio.gather(running, replacement)
+        return queue
+
+    queue = asyncio.run(main())
+    assert queue.running == 0
+    assert queue.completed == 2
+
+
+def test_cancel_after_handover_passes_slot_on():
+    async def main():
+        queue = JobQueue("test", concurrency=1, max_depth=2)
+        release = asyncio.Event()
+        done = []
+        tasks = {}
+
+        async def job(name):
+            done.append(name)
+
+        def on_last_position(position):
+            # Fires as the slot is handed over, before the new owner wakes up
+            if position == 1:
+                tasks["handed"].cancel()
+
+        running = asyncio.create_task(queue.run(release.wait))
+        await asyncio.sleep(0)
+        tasks["handed"] = asyncio.create_task(queue.run(job, "handed"))
+        await asyncio.sleep(0)
+        last = asyncio.create_task(queue.run(job, "last", on_position=on_last_position))
+        await asyncio.sleep(0)
+
+        release.set()
+        await asyncio.gather(running, tasks["handed"], last, return_exceptions=True)
+        return queue, done
+
+    queue, done = asyncio.run(main())
+    assert done == ["last"]
+    assert queue.running == 0 and queue.depth == 0
+
+
+def test_failed_job_releases_slot():
+    async def main():
+        queue = JobQueue("test", concurrency=1, max_depth=1)
+
+        async def boom():
+            raise RuntimeError("failed")
+
+        with pytest.raises(RuntimeError):
+            await queue.run(boom)
+        return queue
+
+    queue = asyncio.run(main())
+    assert queue.failed == 1
+    assert queue.running == 0
@@ -0,0 +1,70 @@
+import asyncio
+import pytest
+from utils.router import CallbackRouter, encode_callback, parse_callback
+
+
+def test_round_trip_with_args():
+    assert parse_callback(encode_callback("role", "buyer", 123)) == ("role", ["buyer", "123"])
+
+
+def test_plain_action():
+    assert parse_callback(encode_callback("create")) == ("create", [])
+
+
+def test_legacy_role_prefix():
+    assert parse_callback(b"role_seller_-100123") == ("role", ["seller", "-100123"])
+
+
+def test_unknown_version_ignored():
+    assert parse_callback(b"9:role:buyer") == (None, [])
+
+
+def test_oversized_payload_rejected():
+    with pytest.raises(ValueError):
+        encode_callback("role", "x" * 64)
+
+
+class FakeEvent:
+    def __init__(self, data):
+        self.data = data
+        self.answers = []
+
+    async def answer(self, *args, **kwargs):
+        self.answers.append(args)
+
+
+def _dispatch(router, data):
+    event = FakeEvent(data)
+    asyncio.run(router.dispatch(event))
+    return event
+
+
+def test_dispatch_passes_expected_args():
+    calls = []
+
+    async def role(event, role, group_key):
+        calls.append((role, group_key))
+
+    router = CallbackRouter()
+    router.add("role", role, args=2)
+    event = _dispatch(router, encode_callback("role", "buyer", "-1001"))
+    assert calls == [("buyer", "-1001")]
+    assert event.answers == []
+
+
+def test_dispatch_answers_mismatched_args_without_calling():
+    calls = []
+
+    async def create(event):
+        calls.append("create")
+
+    async def role(event, role, group_key):
+        calls.append("role")
+
+    router = CallbackRouter()
+    router.add("create", create)
+    router.add("role", role, args=2)
+    extra = _dispatch(router, b"1:create:x")
+    missing = _dispatch(router, b"1:role")
+    assert calls == []
+    assert len(extra.answers) == 1 and len(missing.answers) == 1
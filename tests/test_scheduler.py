@@ -0,0 +1,129 @@
+import asyncio
+import pytest
+from telethon.errors import FloodWaitError
+from utils.deleter import BatchDeleter
+from utils.scheduler import (
+    RequestScheduler, TokenBucket, request_lane, INTERACTIVE, BACKGROUND, MAX_FLOOD_RETRIES
+)
+
+
+class DeleteMessagesRequest:
+    pass
+
+
+class FakeClient:
+    """Routes delete_messages through a scheduler, raising FloodWait for the first calls"""
+
+    def __init__(self, scheduler, flood_waits=0, seconds=0):
+        self.scheduler = scheduler
+        self.flood_waits = flood_waits
+        self.seconds = seconds
+        self.attempts = 0
+        self.flood_reports = []
+
+    def on_flood_wait(self, method, seconds):
+        self.flood_reports.append((method, seconds))
+
+    async def delete_messages(self, chat, ids):
+        async def send():
+            self.attempts += 1
+            if self.flood_waits:
+                self.flood_waits -= 1
+                raise FloodWaitError(request=None, capture=self.seconds)
+            return ids
+        return await self.scheduler.call(self, DeleteMessagesRequest(), send)
+
+
+def test_token_bucket_refills(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr("utils.scheduler.time.monotonic", lambda: now[0])
+    bucket = TokenBucket(rate=2, capacity=1)
+    assert bucket.delay() == 0
+    bucket.take()
+    assert bucket.delay() == pytest.approx(0.5)
+    now[0] += 0.5
+    assert bucket.delay() == 0
+
+
+def test_interactive_lane_goes_first():
+    async def main():
+        scheduler = RequestScheduler(rate=50, burst=1, method_limits={})
+        client = object()
+        order = []
+
+        async def send(name):
+            order.append(name)
+
+        # Use up the burst so the next requests queue behind the bucket
+        await scheduler.call(client, DeleteMessagesRequest(), lambda: send("first"))
+        with request_lane(BACKGROUND):
+            background = asyncio.ensure_future(
+                scheduler.call(client, DeleteMessagesRequest(), lambda: send("background"))
+            )
+        await asyncio.sleep(0)
+        with request_lane(INTERACTIVE):
+            interactive = asyncio.ensure_future(
+                scheduler.call(client, DeleteMessagesRequest(), lambda: send("interactive"))
+            )
+        await asyncio.gather(background, interactive)
+        return order
+
+    assert asyncio.run(main()) == ["first", "interactive", "background"]
+
+
+def test_short_flood_wait_is_retried_and_reported():
+    async def main():
+        scheduler = RequestScheduler(method_limits={})
+        client = FakeClient(scheduler, flood_waits=1, seconds=0)
+        result = await client.delete_messages(None, [1])
+        return scheduler, client, result
+
+    scheduler, client, result = asyncio.run(main())
+    assert result == [1]
+    assert client.attempts == 2
+    assert client.flood_reports == [("DeleteMessagesRequest", 0)]
+    assert scheduler.stats()["client1"]["flood_waits"] == {"DeleteMessagesRequest": 1}
+
+
+def test_flood_wait_blocks_the_method(monkeypatch):
+    async def main():
+        scheduler = RequestScheduler(method_limits={})
+        gate = scheduler.gate(object())
+        gate.block("DeleteMessagesRequest", 0.05)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await gate.acquire(BACKGROUND, "DeleteMessagesRequest")
+        blocked = loop.time() - started
+        started = loop.time()
+        await gate.acquire(BACKGROUND, "SendMessageRequest")
+        return blocked, loop.time() - started
+
+    blocked, other = asyncio.run(main())
+    assert blocked >= 0.04
+    assert other < 0.04
+
+
+def test_long_flood_wait_reaches_caller_without_retry():
+    async def main():
+        scheduler = RequestScheduler(method_limits={}, max_flood_wait=1)
+        client = FakeClient(scheduler, flood_waits=1, seconds=30)
+        with pytest.raises(FloodWaitError):
+            await client.delete_messages(None, [1])
+        return client
+
+    assert asyncio.run(main()).attempts == 1
+
+
+def test_deleter_does_not_retry_on_top_of_the_scheduler():
+    async def main():
+        scheduler = RequestScheduler(method_limits={})
+        client = FakeClient(scheduler, flood_waits=100, seconds=0)
+        deleter = BatchDeleter(window=0)
+        deleter.add(client, 1, "chat", 10, "joined")
+        await deleter.flush_all()
+        return client, deleter
+
+    client, deleter = asyncio.run(main())
+    assert client.attempts == MAX_FLOOD_RETRIES + 1
+    assert deleter.failed == 1
+    assert deleter.deleted_by_kind == {}
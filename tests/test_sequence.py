@@ -0,0 +1,61 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from utils.sequence import SequenceService
+
+
+def test_numbers_unique_across_threads(tmp_path):
+    sequence = SequenceService(path=str(tmp_path / "counter.json"), block_size=5)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        numbers = list(pool.map(lambda _: sequence.next("p2p"), range(200)))
+    assert sorted(numbers) == list(range(1, 201))
+
+
+def test_numbers_unique_across_tasks(tmp_path):
+    sequence = SequenceService(path=str(tmp_path / "counter.json"), block_size=3)
+
+    async def main():
+        return await asyncio.gather(*(asyncio.to_thread(sequence.next, "other") for _ in range(50)))
+
+    numbers = asyncio.run(main())
+    assert len(set(numbers)) == 50
+
+
+def test_restart_resumes_after_reserved_block(tmp_path):
+    path = str(tmp_path / "counter.json")
+    first = SequenceService(path=path, block_size=10)
+    before = [first.next("p2p") for _ in range(3)]
+
+    # Simulate a restart: the unused part of the block is skipped, never reused
+    second = SequenceService(path=path, block_size=10)
+    after = [second.next("p2p") for _ in range(3)]
+
+    assert before == [1, 2, 3]
+    assert min(after) > max(before)
+    assert after == [11, 12, 13]
+
+
+def test_types_are_numbered_independently(tmp_path):
+    path = tmp_path / "counter.json"
+    sequence = SequenceService(path=str(path), block_size=4)
+    assert sequence.next("p2p") == 1
+    assert sequence.next("other") == 1
+    assert json.loads(path.read_text()) == {"p2p": 5, "other": 5}
+
+
+def test_failed_checkpoint_hands_out_nothing(tmp_path, monkeypatch):
+    sequence = SequenceService(path=str(tmp_path / "counter.json"), block_size=2)
+
+    def fail():
+        raise OSError("disk full")
+
+    monkeypatch.setattr(sequence, "_checkpoint", fail)
+    try:
+        sequence.next("p2p")
+    except OSError:
+        pass
+    else:
+        raise AssertionError("next() should fail when the block cannot be reserved")
+
+    monkeypatch.undo()
+    assert sequence.next("p2p") == 1
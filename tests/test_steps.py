@@ -0,0 +1,83 @@
+import asyncio
+import pytest
+from utils.steps import StepGraph
+
+
+def build(fail=(), calls=None):
+    """The provisioning shape with the named steps raising"""
+    calls = [] if calls is None else calls
+
+    def step(name):
+        async def func(results):
+            calls.append(name)
+            await asyncio.sleep(0)
+            if name in fail:
+                raise RuntimeError(f"{name} broke")
+            return name
+        return func
+
+    graph = StepGraph("test")
+    graph.add("create", step("create"))
+    graph.add("promote", step("promote"), after=["create"])
+    graph.add("welcome", step("welcome"), after=["promote"], required=False)
+    graph.add("invite", step("invite"), after=["create"])
+    return graph, calls
+
+
+def test_all_steps_succeed():
+    graph, calls = build()
+    assert asyncio.run(graph.run()) is True
+    assert graph.ok and graph.failed == []
+    assert set(graph.results) == {"create", "promote", "welcome", "invite"}
+    assert not graph.skipped and not graph.errors
+    assert calls.index("create") < calls.index("promote") < calls.index("welcome")
+
+
+def test_optional_failure_keeps_the_graph_ok():
+    graph, _ = build(fail=("welcome",))
+    assert asyncio.run(graph.run()) is True
+    assert "welcome" not in graph.results
+    assert isinstance(graph.errors["welcome"], RuntimeError)
+    assert "welcome: failed" in graph.report()
+
+
+def test_failure_skips_dependents_but_not_independent_steps():
+    graph, calls = build(fail=("promote",))
+    assert asyncio.run(graph.run()) is False
+    assert graph.skipped == {"welcome"}
+    assert "welcome" not in calls
+    assert "invite" in graph.results
+    # Only required steps count as failed; the skipped welcome is optional
+    assert graph.failed == ["promote"]
+    assert "welcome: skipped" in graph.report()
+
+
+def test_root_failure_skips_everything_after_it():
+    graph, calls = build(fail=("create",))
+    assert asyncio.run(graph.run()) is False
+    assert calls == ["create"]
+    assert graph.skipped == {"promote", "welcome", "invite"}
+    assert graph.failed == ["create", "promote", "invite"]
+    assert set(graph.timings) == {"create"}
+
+
+def test_unknown_dependency_is_rejected():
+    graph = StepGraph("test")
+    with pytest.raises(ValueError):
+        graph.add("invite", lambda results: None, after=["create"])
+
+
+def test_callback_errors_do_not_fail_the_step():
+    seen = []
+
+    def on_step(name):
+        seen.append(name)
+        raise RuntimeError("display broke")
+
+    async def ok(results):
+        return 1
+
+    graph = StepGraph("test", on_step=on_step)
+    graph.add("create", ok)
+    assert asyncio.run(graph.run()) is True
+    assert seen == ["create"] and graph.results == {"create": 1}
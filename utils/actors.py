@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Per-group serialized execution of state changes
+"""
+import asyncio
+from collections import deque
+
+
+class GroupActors:
+    """
+    One mailbox per group key
+
+    Jobs for the same group run strictly one after another in arrival
+    order, jobs for different groups run concurrently. A mailbox and its
+    worker only exist while the group has queued work.
+    """
+
+    def __init__(self):
+        self._mailboxes = {}
+
+    @property
+    def active(self):
+        """Number of groups with queued or running work"""
+        return len(self._mailboxes)
+
+    async def run(self, group_key, func, *args, **kwargs):
+        """Queue a coroutine function on a group's mailbox and await its result"""
+        group_key = str(group_key)
+        future = asyncio.get_running_loop().create_future()
+
+        mailbox = self._mailboxes.get(group_key)
+        if mailbox is None:
+            mailbox = deque()
+            self._mailboxes[group_key] = mailbox
+            asyncio.create_task(self._drain(group_key, mailbox))
+
+        mailbox.append((func, args, kwargs, future))
+        return await future
+
+    async def _drain(self, group_key, mailbox):
+        """Process a mailbox until it is empty, then retire it"""
+        try:
+            while mailbox:
+                func, args, kwargs, future = mailbox.popleft()
+                if future.cancelled():
+                    continue
+                try:
+                    result = await func(*args, **kwargs)
+                except asyncio.CancelledError:
+                    # e.g. a request cut off by client.disconnect() - the
+                    # caller must still be woken, and later jobs still run
+                    if not future.done():
+                        future.cancel()
+                except BaseException as e:
+                    if not future.done():
+                        future.set_exception(e)
+                    if not isinstance(e, Exception):
+                        raise
+                else:
+                    if not future.done():
+                        future.set_result(result)
+        finally:
+            if self._mailboxes.get(group_key) is mailbox:
+                del self._mailboxes[group_key]
+            # Leaving early - nothing will run the jobs still queued
+            for *_, future in mailbox:
+                if not future.done():
+                    future.cancel()
+            mailbox.clear()
+
+
+group_actors = GroupActors()
@@ -1,5 +1,6 @@
 from telethon import Button
 from telethon.tl.types import KeyboardButtonCopy
+from utils.router import encode_callback
 
 # ======================================================
 # MAIN MENU BUTTONS
@@ -80,7 +81,7 @@ def get_session_buttons(group_key):
     """Get buttons for session initiation"""
     return [
         [
-            Button.inline("Buyer", f"role_buyer_{group_key}".encode()),
-            Button.inline("Seller", f"role_seller_{group_key}".encode())
+            Button.inline("Buyer", encode_callback("role", "buyer", group_key)),
+            Button.inline("Seller", encode_callback("role", "seller", group_key))
         ]
     ]
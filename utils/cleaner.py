@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Removal of service messages in managed escrow groups
+"""
+from telethon import events
+from utils.deleter import message_deleter
+from utils.state import get_state
+from utils.metrics import HANDLER_SECONDS
+
+# Telegram service notifications and the anonymous admin bot
+SYSTEM_SENDERS = frozenset({777000, 1087968824})
+
+
+def action_kind(event):
+    """Name of a ChatAction worth cleaning, or None"""
+    if event.user_joined:
+        return "joined"
+    if event.user_added:
+        return "added"
+    if event.user_left:
+        return "left"
+    if event.user_kicked:
+        return "kicked"
+    if event.new_pin:
+        return "pinned"
+    return None
+
+
+class ServiceMessageCleaner:
+    """Deletes join/leave/pin style service messages, only in groups the bot created"""
+
+    def __init__(self):
+        self.failed = 0
+
+    @staticmethod
+    def is_managed(event):
+        """O(1) check against the in-memory group index"""
+        return get_state().is_managed(event.chat_id)
+
+    def register(self, client):
+        """Attach the cleaner's handlers to the bot client"""
+        client.add_event_handler(
+            self.on_chat_action,
+            events.ChatAction(func=self.is_managed)
+        )
+        client.add_event_handler(
+            self.on_system_message,
+            events.NewMessage(func=lambda e: e.sender_id in SYSTEM_SENDERS and self.is_managed(e))
+        )
+
+    async def on_chat_action(self, event):
+        with HANDLER_SECONDS.time(handler="chat_action"):
+            kind = action_kind(event)
+            if kind and event.action_message:
+                await self._delete(event, event.action_message.id, kind)
+
+    async def on_system_message(self, event):
+        with HANDLER_SECONDS.time(handler="system_message"):
+            await self._delete(event, event.id, "system")
+
+    async def _delete(self, event, message_id, kind):
+        """Hand the message to the batch deleter"""
+        try:
+            input_chat = await event.get_input_chat()
+            message_deleter.add(event.client, event.chat_id, input_chat, message_id, kind)
+        except Exception as e:
+            self.failed += 1
+            print(f"[CLEANER] Could not queue {kind} message: {e}")
+
+    def stats(self):
+        """Messages actually deleted per kind, plus deletion batch metrics"""
+        return {
+            "removed": dict(message_deleter.deleted_by_kind),
+            "failed": self.failed,
+            "batches": message_deleter.stats()
+        }
+
+
+service_cleaner = ServiceMessageCleaner()
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Long-lived user client pool for group creation
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from telethon.utils import get_input_peer
+from telethon.sessions import StringSession
+from config import (
+    API_ID, API_HASH, STRING_SESSIONS, LOG_CHANNEL_ID,
+    USER_POOL_HEALTH_INTERVAL, USER_POOL_MAX_BACKOFF
+)
+from utils.entities import EntityCache
+from utils.scheduler import ScheduledClient, request_lane, BACKGROUND
+
+
+class UserPoolUnavailable(Exception):
+    """Raised when no healthy user client can be lent out"""
+
+
+class PooledUserClient:
+    """A connected user session with its cached identity"""
+
+    def __init__(self, name, session_string):
+        self.name = name
+        self.session_string = session_string
+        self.client = None
+        self.entities = None
+        self.healthy = False
+        self.in_use = 0
+        self.backoff = 1
+        self.next_retry = 0
+        self.cooldown_until = 0
+
+        self.acquired = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.flood_waits = 0
+        self.flood_wait_seconds = 0
+
+    @property
+    def creator(self):
+        """Session account, cached at connect"""
+        return self.entities.peek("me") if self.entities else None
+
+    @property
+    def cooling_down(self):
+        return time.monotonic() < self.cooldown_until
+
+    def on_flood_wait(self, method, seconds):
+        """Scheduler hook - rest the account so new work goes to the others"""
+        self.flood_waits += 1
+        self.flood_wait_seconds += seconds
+        self.cooldown_until = max(self.cooldown_until, time.monotonic() + seconds)
+        print(f"[POOL] {self.name} cooling down {seconds}s after FloodWait on {method}")
+
+    @property
+    def creator_name(self):
+        """Username of the session account, or its ID"""
+        if not self.creator:
+            return None
+        return self.creator.username if self.creator.username else f"ID:{self.creator.id}"
+
+    @staticmethod
+    async def _resolve_input(client, username):
+        """InputPeer for a username, looked up on Telegram rather than the session"""
+        return get_input_peer(await client.get_entity(username))
+
+    async def connect(self, bot_username):
+        """Connect the session and resolve its entities once"""
+        if self.client is None:
+            self.client = ScheduledClient(
+                StringSession(self.session_string), API_ID, API_HASH, label=self.name
+            )
+            self.client.on_flood_wait = self.on_flood_wait
+            self.entities = EntityCache(self.client)
+            self.entities.register("me", lambda client: client.get_me())
+            # get_entity resolves the username over the network, so a refresh after
+            # a stale-peer error really fetches a new access hash
+            self.entities.register("bot", lambda client: self._resolve_input(client, bot_username))
+            self.entities.register("log_channel", lambda client: client.get_entity(LOG_CHANNEL_ID))
+
+        if not self.client.is_connected():
+            await self.client.connect()
+
+        # Never prompt for login from a background task
+        if not await self.client.is_user_authorized():
+            raise UserPoolUnavailable(f"{self.name} is not authorized")
+
+        await self.entities.get("me")
+        await self.entities.get("bot")
+        # The log channel is optional; a failure here is retried on first use
+        await self.entities.warm("log_channel")
+        self.healthy = True
+        self.backoff = 1
+        self.next_retry = 0
+        print(f"[POOL] {self.name} connected as @{self.creator_name}")
+
+    async def check(self):
+        """Round-trip to Telegram to confirm the session is alive"""
+        if not self.client or not self.client.is_connected():
+            raise ConnectionError(f"{self.name} disconnected")
+        self.entities.set("me", await self.client.get_me())
+
+    def mark_unhealthy(self, error):
+        """Take the session out of rotation and schedule a reconnect"""
+        self.healthy = False
+        self.next_retry = time.monotonic() + self.backoff
+        print(f"[POOL] {self.name} unhealthy ({error}), retry in {self.backoff}s")
+        self.backoff = min(self.backoff * 2, USER_POOL_MAX_BACKOFF)
+
+    def stats(self):
+        """Load and health metrics of this account"""
+        return {
+            "healthy": self.healthy,
+            "in_use": self.in_use,
+            "acquired": self.acquired,
+            "errors": self.errors,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "flood_waits": self.flood_waits,
+            "flood_wait_seconds": self.flood_wait_seconds,
+            "cooldown_remaining": max(0, round(self.cooldown_until - time.monotonic(), 1))
+        }
+
+    async def disconnect(self):
+        """Disconnect the underlying client"""
+        self.healthy = False
+        if self.client and self.client.is_connected():
+            await self.client.disconnect()
+
+
+class UserClientPool:
+    """Keeps user sessions connected and lends them out to creations"""
+
+    def __init__(self, sessions, health_interval=USER_POOL_HEALTH_INTERVAL):
+        self.members = [
+            PooledUserClient(name, session)
+            for name, session in sessions.items() if session
+        ]
+        self.health_interval = health_interval
+        self.bot_username = None
+        self._health_task = None
+
+    async def start(self, bot_username):
+        """Connect every session and start the health check loop"""
+        self.bot_username = bot_username
+
+        for member in self.members:
+            try:
+                await member.connect(bot_username)
+            except Exception as e:
+                member.mark_unhealthy(e)
+
+        if self._health_task is None:
+            # The task inherits the lane, so health checks never delay users
+            with request_lane(BACKGROUND):
+                self._health_task = asyncio.create_task(self._health_loop())
+
+    async def stop(self):
+        """Stop health checks and disconnect every session"""
+        if self._health_task:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+
+        for member in self.members:
+            try:
+                await member.disconnect()
+            except Exception as e:
+                print(f"[POOL] Disconnect {member.name}: {e}")
+
+    async def _reconnect(self, member):
+        """Reconnect a session, rescheduling with backoff on failure"""
+        try:
+            if member.client and member.client.is_connected():
+                await member.client.disconnect()
+            await member.connect(self.bot_username)
+        except Exception as e:
+            member.mark_unhealthy(e)
+
+    async def _health_loop(self):
+        """Ping healthy sessions and reconnect failed ones when due"""
+        while True:
+            now = time.monotonic()
+            for member in self.members:
+                if member.healthy:
+                    try:
+                        await member.check()
+                    except Exception as e:
+                        member.mark_unhealthy(e)
+                elif now >= member.next_retry:
+                    await self._reconnect(member)
+
+            # Wake up early when a reconnect is due before the next check
+            pending = [m.next_retry - time.monotonic() for m in self.members if not m.healthy]
+            delay = min([self.health_interval] + pending)
+            await asyncio.sleep(max(delay, 1))
+
+    def get(self, name):
+        """Session by name"""
+        for member in self.members:
+            if member.name == name:
+                return member
+        return None
+
+    def _pick(self):
+        """
+        Least loaded healthy session, preferring accounts not cooling down
+
+        Ties go to the account used least, so work spreads evenly.
+        """
+        healthy = [m for m in self.members if m.healthy]
+        if not healthy:
+            return None
+        ready = [m for m in healthy if not m.cooling_down]
+        if ready:
+            return min(ready, key=lambda m: (m.in_use, m.acquired))
+        # Every account is resting - take the one free soonest
+        return min(healthy, key=lambda m: (m.cooldown_until, m.in_use))
+
+    @asynccontextmanager
+    async def acquire(self, name=None):
+        """Lend a connected session (or the named one) for the duration of the block"""
+        if name is not None:
+            member = self.get(name)
+            if member is None or not member.healthy:
+                raise UserPoolUnavailable(f"{name} is not available")
+        else:
+            member = self._pick()
+
+        if member is None:
+            # Nothing healthy - try the one session whose reconnect is due,
+            # leaving the rest to the health loop and its backoff
+            now = time.monotonic()
+            due = [m for m in self.members if not m.healthy and now >= m.next_retry]
+            if due:
+                candidate = min(due, key=lambda m: m.next_retry)
+                # Claim the attempt so concurrent clicks do not retry it too
+                candidate.next_retry = now + candidate.backoff
+                await self._reconnect(candidate)
+                if candidate.healthy:
+                    member = candidate
+
+        if member is None:
+            raise UserPoolUnavailable("No healthy user session available")
+
+        member.in_use += 1
+        member.acquired += 1
+        started = time.monotonic()
+        try:
+            yield member
+        except (ConnectionError, OSError) as e:
+            member.errors += 1
+            member.mark_unhealthy(e)
+            raise
+        except Exception:
+            member.errors += 1
+            raise
+        finally:
+            member.in_use -= 1
+            member.busy_seconds += time.monotonic() - started
+
+    def stats(self):
+        """Per-account metrics"""
+        return {member.name: member.stats() for member in self.members}
+
+
+user_pool = UserClientPool(STRING_SESSIONS)
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Single-flight deduplication and per-user rate limits for repeated clicks
+"""
+import asyncio
+import time
+from collections import deque
+from config import CREATE_USER_LIMIT, CREATE_USER_WINDOW
+
+# Rate limiter keys kept before idle ones are swept
+MAX_TRACKED_KEYS = 10000
+
+
+class Flight:
+    """One in-flight call that duplicate callers can wait on"""
+
+    def __init__(self, task, owner):
+        self.task = task
+        self.owner = owner
+        self.joined = 0
+
+    async def wait(self):
+        # Shielded so a cancelled caller does not cancel the shared work
+        return await asyncio.shield(self.task)
+
+
+class SingleFlight:
+    """Runs at most one call per key; later callers get the same result"""
+
+    def __init__(self):
+        self._flights = {}
+        self.started = 0
+        self.joined = 0
+
+    def get(self, key):
+        """The flight running for a key, or None"""
+        return self._flights.get(key)
+
+    def start(self, key, func, *args, owner=None, **kwargs):
+        """Start `func(*args, **kwargs)` as the flight for key"""
+        task = asyncio.ensure_future(func(*args, **kwargs))
+        flight = Flight(task, owner)
+        self._flights[key] = flight
+        self.started += 1
+
+        def landed(_):
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+        task.add_done_callback(landed)
+        return flight
+
+    def join(self, flight):
+        """Count a duplicate caller attaching to a flight"""
+        flight.joined += 1
+        self.joined += 1
+        return flight
+
+    @property
+    def in_flight(self):
+        return len(self._flights)
+
+    def stats(self):
+        return {"in_flight": self.in_flight, "started": self.started, "joined": self.joined}
+
+
+class RateLimiter:
+    """Sliding window of at most `limit` events per key every `window` seconds"""
+
+    def __init__(self, limit=CREATE_USER_LIMIT, window=CREATE_USER_WINDOW):
+        self.limit = limit
+        self.window = window
+        self._events = {}
+        self.rejected = 0
+
+    def allow(self, key):
+        """
+        Record an event for key if it is within the limit
+
+        Returns:
+            tuple: (allowed: bool, seconds until the next event is allowed)
+        """
+        if self.limit <= 0:
+            return True, 0
+
+        now = time.monotonic()
+        if len(self._events) > MAX_TRACKED_KEYS:
+            self._sweep(now)
+
+        events = self._events.setdefault(key, deque())
+        while events and events[0] <= now - self.window:
+            events.popleft()
+
+        if len(events) >= self.limit:
+            self.rejected += 1
+            return False, events[0] + self.window - now
+
+        events.append(now)
+        return True, 0
+
+    def refund(self, key):
+        """Give back the last event for key, for work turned away after allow()"""
+        events = self._events.get(key)
+        if events:
+            events.pop()
+
+    def _sweep(self, now):
+        """Forget keys with no events left in the window"""
+        for key in [k for k, events in self._events.items() if not events or events[-1] <= now - self.window]:
+            del self._events[key]
+
+    def stats(self):
+        return {"tracked_users": len(self._events), "rejected": self.rejected}
+
+
+creation_flights = SingleFlight()
+creation_limiter = RateLimiter()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Coalesced per-chat message deletion
+"""
+import asyncio
+import time
+from telethon.errors import FloodWaitError
+from config import DELETE_BATCH_WINDOW, DELETE_BATCH_MAX
+from utils.scheduler import request_lane, BACKGROUND
+
+
+class BatchDeleter:
+    """
+    Buffers message ids per chat and deletes them with one request per batch
+
+    A batch is sent when its window elapses or it reaches max_batch ids,
+    whichever comes first. Short FloodWaits are sat out by the request
+    scheduler; a batch that still hits one is dropped and counted as failed.
+    """
+
+    def __init__(self, window=DELETE_BATCH_WINDOW, max_batch=DELETE_BATCH_MAX):
+        self.window = window
+        # Telegram accepts at most 100 ids per delete request
+        self.max_batch = max(1, min(max_batch, 100))
+        self._buffers = {}
+        self._timers = {}
+
+        self.batches = 0
+        self.deleted = 0
+        self.deleted_by_kind = {}
+        self.failed = 0
+        self.flood_waits = 0
+        self.max_batch_seen = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    @property
+    def pending(self):
+        """Message ids waiting in buffers"""
+        return sum(len(buffer[2]) for buffer in self._buffers.values())
+
+    def add(self, client, chat_id, input_chat, message_id, kind=None):
+        """Queue one message for deletion, counted under kind once deleted"""
+        buffer = self._buffers.get(chat_id)
+        if buffer is None:
+            buffer = (client, input_chat, [], {})
+            self._buffers[chat_id] = buffer
+        buffer[2].append(message_id)
+        if kind:
+            buffer[3][kind] = buffer[3].get(kind, 0) + 1
+
+        if len(buffer[2]) >= self.max_batch:
+            # Detach the full batch now so later ids start a new one
+            timer = self._timers.pop(chat_id, None)
+            if timer:
+                timer.cancel()
+            asyncio.create_task(self._send(*self._buffers.pop(chat_id)))
+        elif chat_id not in self._timers:
+            self._timers[chat_id] = asyncio.create_task(self._flush_later(chat_id))
+
+    async def _flush_later(self, chat_id):
+        await asyncio.sleep(self.window)
+        self._timers.pop(chat_id, None)
+        await self._flush(chat_id)
+
+    async def _flush(self, chat_id):
+        """Send a chat's buffered ids"""
+        buffer = self._buffers.pop(chat_id, None)
+        if buffer and buffer[2]:
+            await self._send(*buffer)
+
+    async def _send(self, client, input_chat, message_ids, kinds):
+        """One delete request for a batch; the scheduler sits out short FloodWaits"""
+        started = time.monotonic()
+        try:
+            with request_lane(BACKGROUND):
+                await client.delete_messages(input_chat, message_ids)
+        except FloodWaitError as e:
+            # Only waits the scheduler would not sit out get here
+            self.flood_waits += 1
+            self.failed += len(message_ids)
+            print(f"[DELETE] Giving up on {len(message_ids)} messages after FloodWait {e.seconds}s")
+            return
+        except Exception as e:
+            self.failed += len(message_ids)
+            print(f"[DELETE] Batch of {len(message_ids)} failed: {e}")
+            return
+
+        latency = time.monotonic() - started
+        self.batches += 1
+        self.deleted += len(message_ids)
+        for kind, count in kinds.items():
+            self.deleted_by_kind[kind] = self.deleted_by_kind.get(kind, 0) + count
+        self.max_batch_seen = max(self.max_batch_seen, len(message_ids))
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+
+    async def flush_all(self):
+        """Send every buffered batch now"""
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        await asyncio.gather(*(self._flush(chat_id) for chat_id in list(self._buffers)))
+
+    def stats(self):
+        """Batch size and latency metrics"""
+        return {
+            "batches": self.batches,
+            "deleted": self.deleted,
+            "failed": self.failed,
+            "flood_waits": self.flood_waits,
+            "pending": self.pending,
+            "avg_batch_size": round(self.deleted / self.batches, 2) if self.batches else 0,
+            "max_batch_size": self.max_batch_seen,
+            "avg_latency_ms": round(self.total_latency / self.batches * 1000, 1) if self.batches else 0,
+            "max_latency_ms": round(self.max_latency * 1000, 1)
+        }
+
+
+message_deleter = BatchDeleter()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Entity cache resolved once per client and refreshed when a request fails
+"""
+import asyncio
+from telethon.errors import (
+    ChannelInvalidError, ChannelPrivateError, PeerIdInvalidError, UserIdInvalidError
+)
+
+
+class EntityCache:
+    """
+    Named entities of one client
+
+    Each name has a resolver coroutine run on first use. The result is kept
+    until a request made with it fails with an invalid-peer style error,
+    then it is resolved again once.
+    """
+
+    # Errors that mean the cached entity itself is stale; any other error
+    # (e.g. USER_ALREADY_PARTICIPANT) is about the request and must not
+    # resend it
+    REFRESH_ERRORS = (
+        PeerIdInvalidError, ChannelInvalidError, ChannelPrivateError,
+        UserIdInvalidError, ValueError
+    )
+
+    def __init__(self, client):
+        self.client = client
+        self._resolvers = {}
+        self._entities = {}
+        self._locks = {}
+
+    def register(self, name, resolver):
+        """Resolve `name` with `await resolver(client)` when first needed"""
+        self._resolvers[name] = resolver
+        self._locks[name] = asyncio.Lock()
+
+    def peek(self, name):
+        """Cached entity without resolving, or None"""
+        return self._entities.get(name)
+
+    def set(self, name, entity):
+        """Replace a cached entity with a fresher one"""
+        self._entities[name] = entity
+
+    async def get(self, name):
+        """Cached entity, resolving it on first use"""
+        entity = self._entities.get(name)
+        if entity is not None:
+            return entity
+
+        # Concurrent callers share one resolution
+        async with self._locks[name]:
+            entity = self._entities.get(name)
+            if entity is None:
+                entity = await self._resolvers[name](self.client)
+                self._entities[name] = entity
+            return entity
+
+    def invalidate(self, name=None):
+        """Forget one entity, or all of them"""
+        if name is None:
+            self._entities.clear()
+        else:
+            self._entities.pop(name, None)
+
+    async def warm(self, *names):
+        """Resolve entities up front, returning the names that failed"""
+        failed = []
+        for name in names or tuple(self._resolvers):
+            try:
+                await self.get(name)
+            except Exception as e:
+                failed.append(name)
+                print(f"[ENTITIES] Could not resolve {name}: {e}")
+        return failed
+
+    async def call(self, name, func):
+        """Run `await func(entity)`, re-resolving once if the entity went stale"""
+        entity = await self.get(name)
+        try:
+            return await func(entity)
+        except self.REFRESH_ERRORS as e:
+            print(f"[ENTITIES] Refreshing {name} after: {e}")
+            self.invalidate(name)
+            entity = await self.get(name)
+            return await func(entity)
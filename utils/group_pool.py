@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Warm pool of pre-provisioned escrow supergroups
+"""
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from telethon.errors import (
+    ChannelInvalidError, ChannelPrivateError, ChatIdInvalidError, PeerIdInvalidError
+)
+from telethon.tl import functions, types
+from config import GROUP_POOL_LOW, GROUP_POOL_HIGH, GROUP_POOL_FILE
+from utils.client_pool import user_pool, UserPoolUnavailable
+from utils.group_setup import provision_group
+from utils.scheduler import request_lane, BACKGROUND
+
+# Placeholder titles until a group is claimed and numbered
+POOL_TITLES = {
+    "p2p": "𝖯2𝖯 𝘌𝘴𝘤𝘳𝘰𝘸 𝘚𝘦𝘴𝘴𝘪𝘰𝘯",
+    "other": "𝖮𝖳𝖢 𝘌𝘴𝘤𝘳𝘰𝘸 𝘚𝘦𝘴𝘴𝘪𝘰𝘯"
+}
+
+# Seconds to wait after a failed provisioning attempt
+REFILL_RETRY_DELAY = 30
+
+# Errors meaning the pooled group itself is gone or unusable
+CHANNEL_GONE_ERRORS = (
+    ChannelInvalidError, ChannelPrivateError, ChatIdInvalidError, PeerIdInvalidError
+)
+
+
+class GroupWarmPool:
+    """Keeps ready-to-use groups per type and refills them in the background"""
+
+    def __init__(self, client_pool, low=GROUP_POOL_LOW, high=GROUP_POOL_HIGH, pool_file=GROUP_POOL_FILE):
+        self.client_pool = client_pool
+        self.low = low
+        self.high = max(high, low)
+        self.pool_file = pool_file
+        self.ready = {group_type: deque() for group_type in POOL_TITLES}
+        self.bot_username = None
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    @property
+    def enabled(self):
+        return self.low > 0
+
+    def load(self):
+        """Load groups provisioned before the last restart"""
+        if not os.path.exists(self.pool_file):
+            return
+        try:
+            with open(self.pool_file, 'r') as f:
+                entries = json.load(f)
+            for entry in entries:
+                if entry.get("group_type") not in self.ready:
+                    continue
+                if self.client_pool.get(entry.get("session")) is None:
+                    # The owning session is no longer configured; the group
+                    # could never be claimed and would block refills
+                    print(f"[POOL] Discarding pooled group {entry.get('chat_id')}: "
+                          f"session {entry.get('session')} not configured")
+                    continue
+                self.ready[entry["group_type"]].append(entry)
+        except Exception as e:
+            print(f"[POOL] Could not load warm pool: {e}")
+
+    def save(self):
+        """Persist the ready groups so none are orphaned by a restart"""
+        entries = [entry for queue in self.ready.values() for entry in queue]
+        os.makedirs(os.path.dirname(self.pool_file) or '.', exist_ok=True)
+        with open(self.pool_file, 'w') as f:
+            json.dump(entries, f, indent=2)
+
+    async def start(self, bot_username):
+        """Load persisted groups and start the refill loop"""
+        if not self.enabled:
+            return
+        self.bot_username = bot_username
+        self.load()
+        with request_lane(BACKGROUND):
+            self._task = asyncio.create_task(self._refill_loop())
+        self._wakeup.set()
+
+    async def stop(self):
+        """Stop refilling"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _needs_refill(self):
+        return [t for t, queue in self.ready.items() if len(queue) < self.low]
+
+    async def _refill_loop(self):
+        """Top a type up to the high watermark once it drops below the low one"""
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+
+            for group_type in self._needs_refill():
+                while len(self.ready[group_type]) < self.high:
+                    try:
+                        async with self.client_pool.acquire() as member:
+                            entry = await provision_group(
+                                member, POOL_TITLES[group_type], self.bot_username, group_type
+                            )
+                    except Exception as e:
+                        entry = None
+                        print(f"[POOL] Provisioning {group_type} failed: {e}")
+
+                    if not entry:
+                        await asyncio.sleep(REFILL_RETRY_DELAY)
+                        self._wakeup.set()
+                        break
+
+                    entry["provisioned_at"] = time.time()
+                    self.ready[group_type].append(entry)
+                    self.save()
+                    print(f"[POOL] {group_type.upper()} ready: {len(self.ready[group_type])}/{self.high}")
+
+    async def claim(self, group_type, title):
+        """
+        Rename and hand out a ready group
+
+        Returns:
+            provisioning dict, or None when the pool is empty
+        """
+        queue = self.ready.get(group_type)
+        entry = None
+        changed = False
+
+        for _ in range(len(queue or ())):
+            candidate = queue.popleft()
+            try:
+                async with self.client_pool.acquire(candidate["session"]) as member:
+                    channel = types.InputPeerChannel(
+                        channel_id=candidate["chat_id"],
+                        access_hash=candidate["access_hash"]
+                    )
+                    await member.client(functions.channels.EditTitleRequest(
+                        channel=channel,
+                        title=title
+                    ))
+                entry = candidate
+                changed = True
+                break
+            except UserPoolUnavailable:
+                # Owning session is reconnecting - keep the group for later
+                queue.append(candidate)
+            except CHANNEL_GONE_ERRORS as e:
+                print(f"[POOL] Dropping pooled group {candidate['chat_id']}: {e}")
+                changed = True
+            except Exception as e:
+                # FloodWait, network errors and the like - the group is fine
+                print(f"[POOL] Keeping pooled group {candidate['chat_id']} after: {e}")
+                queue.append(candidate)
+
+        # Only touch the pool file when its contents changed
+        if changed:
+            self.save()
+        if self.enabled:
+            self._wakeup.set()
+        return entry
+
+
+group_pool = GroupWarmPool(user_pool)
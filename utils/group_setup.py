@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Supergroup provisioning steps shared by direct creation and the warm pool
+"""
+from telethon.tl import functions, types
+from telethon.tl.types import ChatAdminRights
+from utils.steps import StepGraph
+from utils.metrics import CREATE_STEP_SECONDS
+
+CREATOR_RIGHTS = ChatAdminRights(
+    change_info=True,
+    post_messages=True,
+    edit_messages=True,
+    delete_messages=True,
+    ban_users=True,
+    invite_users=True,
+    pin_messages=True,
+    add_admins=True,
+    anonymous=True,
+    manage_call=True,
+    other=True
+)
+
+BOT_RIGHTS = ChatAdminRights(
+    change_info=True,
+    post_messages=True,
+    edit_messages=True,
+    delete_messages=True,
+    ban_users=True,
+    invite_users=True,
+    pin_messages=True,
+    add_admins=False,
+    anonymous=False,
+    manage_call=True,
+    other=True
+)
+
+# Steps that must all finish before progress reports "admins"
+ADMIN_STEPS = ("promote_creator", "promote_bot")
+
+
+async def provision_group(member, title, bot_username, group_type, progress=None):
+    """
+    Create a fully set up escrow supergroup on a pooled user session
+
+    Once the supergroup exists, creator promotion followed by the welcome
+    message, the invite export, and the bot invite followed by its
+    promotion run concurrently. The welcome waits for the creator's
+    promotion so it is posted anonymously.
+
+    progress, if given, is called with "created", "admins" and "invite"
+    as those steps complete
+
+    Returns:
+        dict with chat id, access hash, invite url, whether the welcome
+        was pinned and step timings, or None if a required step failed
+    """
+    user_client = member.client
+    creator = member.creator
+    print(f"[INFO] Using {member.name} (@{member.creator_name})")
+
+    async def create(results):
+        created = await user_client(functions.channels.CreateChannelRequest(
+            title=title,
+            about=f"🔐 Secure {group_type.upper()} Escrow Group\nEscrowed by @{bot_username}",
+            megagroup=True,
+            broadcast=False
+        ))
+        chat = created.chats[0]
+        print(f"[SUCCESS] Supergroup created: {chat.id}")
+        return chat
+
+    def channel_of(results):
+        chat = results["create"]
+        return types.InputPeerChannel(channel_id=chat.id, access_hash=chat.access_hash)
+
+    async def promote_creator(results):
+        await user_client(functions.channels.EditAdminRequest(
+            channel=channel_of(results),
+            user_id=creator,
+            admin_rights=CREATOR_RIGHTS,
+            rank="Owner"
+        ))
+
+    # The bot peer goes through the entity cache so a stale one is re-resolved
+    async def add_bot(results):
+        await member.entities.call(
+            "bot",
+            lambda bot: user_client(functions.channels.InviteToChannelRequest(
+                channel=channel_of(results),
+                users=[bot]
+            ))
+        )
+
+    async def promote_bot(results):
+        await member.entities.call(
+            "bot",
+            lambda bot: user_client(functions.channels.EditAdminRequest(
+                channel=channel_of(results),
+                user_id=bot,
+                admin_rights=BOT_RIGHTS,
+                rank="Escrow Bot"
+            ))
+        )
+
+    async def welcome(results):
+        from utils.texts import WELCOME_MESSAGE
+        channel = channel_of(results)
+        sent_message = await user_client.send_message(
+            channel,
+            WELCOME_MESSAGE.format(bot_username=bot_username),
+            parse_mode='html'
+        )
+        await user_client.pin_message(channel, sent_message, notify=False)
+
+    async def invite(results):
+        invite_link = await user_client(functions.messages.ExportChatInviteRequest(
+            peer=channel_of(results)
+        ))
+        return str(invite_link.link)
+
+    def on_step(name):
+        if not progress:
+            return
+        if name == "create":
+            progress("created")
+        elif name == "invite":
+            progress("invite")
+        elif name in ADMIN_STEPS and all(step in graph.results for step in ADMIN_STEPS):
+            progress("admins")
+
+    graph = StepGraph(f"setup {title}", on_step=on_step)
+    graph.add("create", create)
+    graph.add("promote_creator", promote_creator, after=["create"])
+    graph.add("welcome", welcome, after=["promote_creator"], required=False)
+    graph.add("invite", invite, after=["create"])
+    graph.add("add_bot", add_bot, after=["create"])
+    graph.add("promote_bot", promote_bot, after=["add_bot"])
+
+    await graph.run()
+    print(graph.report())
+    for name, elapsed in graph.timings.items():
+        CREATE_STEP_SECONDS.observe(elapsed, step=name, outcome="failed" if name in graph.errors else "ok")
+
+    if not graph.ok:
+        print(f"[ERROR] Group setup failed at: {', '.join(graph.failed)}")
+        return None
+
+    chat = graph.results["create"]
+    print("[COMPLETE] Group setup done")
+
+    return {
+        "chat_id": chat.id,
+        "access_hash": chat.access_hash,
+        "invite_url": graph.results["invite"],
+        "welcome_pinned": "welcome" in graph.results,
+        "group_type": group_type,
+        "session": member.name,
+        "creator_id": creator.id,
+        "creator_username": member.creator_name,
+        "step_timings": {name: round(t, 3) for name, t in graph.timings.items()}
+    }
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Bounded queue for escrow creation jobs
+"""
+import asyncio
+import time
+from collections import deque
+from config import CREATE_CONCURRENCY, CREATE_QUEUE_MAX
+from utils.metrics import JOB_WAIT_SECONDS, JOB_SERVICE_SECONDS
+
+
+class QueueFull(Exception):
+    """Raised when a job is rejected because the queue is at max depth"""
+
+
+class Job:
+    def __init__(self, on_position):
+        self.on_position = on_position
+        self.position = 0
+        self.ready = asyncio.get_running_loop().create_future()
+        self.enqueued = time.monotonic()
+
+    def report(self, position):
+        """Tell the submitter its queue position, 0 once it starts"""
+        if position == self.position:
+            return
+        self.position = position
+        if self.on_position:
+            try:
+                self.on_position(position)
+            except Exception as e:
+                print(f"[QUEUE] Position callback failed: {e}")
+
+
+class JobQueue:
+    """
+    Runs at most `concurrency` jobs at once, FIFO, with `max_depth` waiting
+
+    Jobs beyond that are rejected with QueueFull straight away instead of
+    piling up. Waiting jobs are told their position whenever it changes.
+    """
+
+    def __init__(self, name, concurrency=CREATE_CONCURRENCY, max_depth=CREATE_QUEUE_MAX):
+        self.name = name
+        self.concurrency = max(1, concurrency)
+        self.max_depth = max_depth
+        self.running = 0
+        self._waiting = deque()
+
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_service = 0.0
+        self.max_service = 0.0
+
+    @property
+    def depth(self):
+        """Jobs waiting for a slot"""
+        return len(self._waiting)
+
+    async def run(self, func, *args, on_position=None, **kwargs):
+        """
+        Queue `await func(*args, **kwargs)` and return its result
+
+        on_position, if given, is called with the job's queue position
+        while it waits and with 0 when it starts.
+        """
+        if self.running >= self.concurrency and len(self._waiting) >= self.max_depth:
+            self.rejected += 1
+            raise QueueFull(f"{self.name} queue is full ({self.max_depth} waiting)")
+
+        self.submitted += 1
+        job = Job(on_position)
+
+        if self.running < self.concurrency and not self._waiting:
+            self.running += 1
+        else:
+            self._waiting.append(job)
+            self._report_positions()
+            try:
+                await job.ready
+            except asyncio.CancelledError:
+                if job in self._waiting:
+                    self._waiting.remove(job)
+                    self._report_positions()
+                else:
+                    # The slot was already handed over - pass it on
+                    self._release()
+                raise
+
+        started = time.monotonic()
+        wait = started - job.enqueued
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        JOB_WAIT_SECONDS.observe(wait, queue=self.name)
+        job.report(0)
+
+        try:
+            result = await func(*args, **kwargs)
+            self.completed += 1
+            return result
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            service = time.monotonic() - started
+            self.total_service += service
+            self.max_service = max(self.max_service, service)
+            JOB_SERVICE_SECONDS.observe(service, queue=self.name)
+            self._release()
+
+    def _release(self):
+        """Hand the finished job's slot to the next waiter, or free it"""
+        while self._waiting:
+            job = self._waiting.popleft()
+            if not job.ready.done():
+                job.ready.set_result(None)
+                self._report_positions()
+                return
+        self.running -= 1
+
+    def _report_positions(self):
+        for position, job in enumerate(self._waiting, 1):
+            job.report(position)
+
+    def stats(self):
+        """Load, rejections and per-job wait and service times"""
+        started = self.completed + self.failed
+        return {
+            "running": self.running,
+            "waiting": self.depth,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(self.total_wait / started * 1000, 1) if started else 0,
+            "max_wait_ms": round(self.max_wait * 1000, 1),
+            "avg_service_ms": round(self.total_service / started * 1000, 1) if started else 0,
+            "max_service_ms": round(self.max_service * 1000, 1)
+        }
+
+
+creation_queue = JobQueue("creation")
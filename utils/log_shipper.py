@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Background shipping of log records to the log channel
+"""
+import asyncio
+import json
+import os
+import time
+from telethon.errors import FloodWaitError
+from config import (
+    LOG_QUEUE_MAX, LOG_BATCH_WINDOW, LOG_MAX_RETRIES,
+    LOG_RETRY_DELAY, LOG_REPLAY_INTERVAL, LOG_SPOOL_FILE
+)
+from utils.client_pool import user_pool
+from utils.scheduler import request_lane, BACKGROUND
+
+# Telegram message length limit
+MESSAGE_LIMIT = 4096
+RECORD_SEPARATOR = "\n\n"
+
+
+def pack(records, limit=MESSAGE_LIMIT):
+    """Group records into as few messages as fit the length limit"""
+    batches = []
+    current = []
+    size = 0
+    for record in records:
+        extra = len(record) + (len(RECORD_SEPARATOR) if current else 0)
+        if current and size + extra > limit:
+            batches.append(current)
+            current = []
+            extra = len(record)
+            size = 0
+        current.append(record)
+        size += extra
+    if current:
+        batches.append(current)
+    return batches
+
+
+class LogShipper:
+    """
+    Delivers log records to the log channel off the request path
+
+    submit() never waits: records go to a bounded queue, or straight to the
+    spool file when the queue is full. The worker coalesces records that
+    arrive within `window` seconds into one message, retries with backoff
+    and spools what it cannot deliver. The spool is replayed once the
+    channel is reachable again.
+    """
+
+    def __init__(self, pool=user_pool, max_queue=LOG_QUEUE_MAX, window=LOG_BATCH_WINDOW,
+                 max_retries=LOG_MAX_RETRIES, retry_delay=LOG_RETRY_DELAY,
+                 replay_interval=LOG_REPLAY_INTERVAL, spool_file=LOG_SPOOL_FILE):
+        self.pool = pool
+        self.max_queue = max_queue
+        self.window = window
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.replay_interval = replay_interval
+        self.spool_file = spool_file
+        self.queue = None
+        self._task = None
+        self._inflight = []
+        self._next_replay = 0
+
+        self.shipped = 0
+        self.messages = 0
+        self.spooled = 0
+        self.replayed = 0
+        self.failed_sends = 0
+
+    @property
+    def replay_file(self):
+        return self.spool_file + ".replay"
+
+    def start(self):
+        """Start the shipping worker"""
+        if self._task is None:
+            self.queue = asyncio.Queue(maxsize=self.max_queue)
+            with request_lane(BACKGROUND):
+                self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the worker and spool whatever was not delivered"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        pending = self._inflight
+        self._inflight = []
+        while self.queue and not self.queue.empty():
+            pending.append(self.queue.get_nowait())
+        if pending:
+            self._spool(pending)
+
+    def submit(self, record):
+        """Queue a formatted record without waiting for delivery"""
+        if self.queue is None:
+            self._spool([record])
+            return
+        try:
+            self.queue.put_nowait(record)
+        except asyncio.QueueFull:
+            self._spool([record])
+
+    async def _collect(self):
+        """Records that arrived together, or [] when idle for the replay interval"""
+        try:
+            first = await asyncio.wait_for(self.queue.get(), timeout=self.replay_interval)
+        except asyncio.TimeoutError:
+            return []
+
+        records = [first]
+        size = len(first)
+        deadline = time.monotonic() + self.window
+        while size < MESSAGE_LIMIT:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                record = await asyncio.wait_for(self.queue.get(), timeout=remaining)
+            except asyncio.TimeoutError:
+                break
+            records.append(record)
+            size += len(record) + len(RECORD_SEPARATOR)
+        return records
+
+    async def _run(self):
+        while True:
+            try:
+                self._inflight = await self._collect()
+                if self._inflight:
+                    await self._ship(self._inflight)
+                    self._inflight = []
+                if time.monotonic() >= self._next_replay:
+                    await self._replay()
+            except Exception as e:
+                # A spool file error must not kill the worker for good
+                print(f"[LOGSHIP] Worker error: {e}")
+                if self._inflight:
+                    self._spool(self._inflight)
+                    self._inflight = []
+                self._next_replay = time.monotonic() + self.replay_interval
+                await asyncio.sleep(self.retry_delay)
+
+    async def _ship(self, records):
+        """Send records as coalesced messages, spooling the rest on failure"""
+        batches = pack(records)
+        for i, batch in enumerate(batches):
+            if not await self._send(RECORD_SEPARATOR.join(batch)):
+                self._spool([record for rest in batches[i:] for record in rest])
+                self._next_replay = time.monotonic() + self.replay_interval
+                return False
+            self.shipped += len(batch)
+            self.messages += 1
+        # Channel is reachable - replay the spool right away
+        self._next_replay = 0
+        return True
+
+    async def _send(self, text):
+        """One channel message, retried with backoff on errors other than FloodWait"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self.pool.acquire() as member:
+                    await member.entities.call(
+                        "log_channel",
+                        lambda channel: member.client.send_message(channel, text, parse_mode='html')
+                    )
+                return True
+            except FloodWaitError:
+                # The scheduler already sat out what it could - spool the rest
+                self.failed_sends += 1
+                return False
+            except Exception as e:
+                delay = self.retry_delay * 2 ** attempt
+                print(f"[LOGSHIP] Send failed: {e}")
+
+            self.failed_sends += 1
+            if attempt < self.max_retries:
+                await asyncio.sleep(delay)
+        return False
+
+    def _spool(self, records):
+        """Append records to the local spool file"""
+        try:
+            with open(self.spool_file, 'a', encoding='utf-8') as f:
+                for record in records:
+                    f.write(json.dumps({"ts": time.time(), "text": record}, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self.spooled += len(records)
+            print(f"[LOGSHIP] Spooled {len(records)} records")
+        except OSError as e:
+            print(f"[LOGSHIP] Could not spool {len(records)} records: {e}")
+
+    def _read_spool(self, path):
+        records = []
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line)["text"])
+                except (ValueError, KeyError):
+                    continue
+        return records
+
+    async def _replay(self):
+        """Ship spooled records; anything still undeliverable is spooled again"""
+        self._next_replay = time.monotonic() + self.replay_interval
+
+        # A replay file left by a crash is shipped before the current spool
+        if not os.path.exists(self.replay_file):
+            if not os.path.exists(self.spool_file) or os.path.getsize(self.spool_file) == 0:
+                return
+            os.replace(self.spool_file, self.replay_file)
+
+        # Not tracked as in flight: the replay file survives a stop mid-replay
+        records = self._read_spool(self.replay_file)
+        delivered = await self._ship(records) if records else True
+        os.remove(self.replay_file)
+
+        if delivered:
+            self.replayed += len(records)
+            print(f"[LOGSHIP] Replayed {len(records)} spooled records")
+
+    def stats(self):
+        """Delivery counters"""
+        return {
+            "queued": self.queue.qsize() if self.queue else 0,
+            "shipped": self.shipped,
+            "messages": self.messages,
+            "spooled": self.spooled,
+            "replayed": self.replayed,
+            "failed_sends": self.failed_sends
+        }
+
+
+log_shipper = LogShipper()
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Logo rendering benchmark and batch renderer
+
+    python -m utils.logo_bench -n 200
+    python -m utils.logo_bench -n 500 --mode single process --workers 4 --json bench.json
+    python -m utils.logo_bench -n 50 --mode single --out-dir renders/
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from datetime import datetime
+from utils.logo_encoder import image_extension
+from utils.logo_generator import LogoGenerator
+
+MODES = ("single", "thread", "process")
+
+# Display names the way they reach the generator from get_user_display
+NAME_CORPUS = [
+    "@alice", "@bob_trader", "@crypto_whale_2024", "@p2p_exchange_official",
+    "@a", "@xX_Sn1per_Xx", "@verylongusernamethatkeepsgoing_forever",
+    "Иван Петров", "Алексей", "محمد علي", "أحمد", "王小明", "李娜",
+    "山田太郎", "김철수", "Nguyễn Văn An", "José Álvarez", "Zoë Ångström",
+    "🚀 Moon Trader", "💎🙌 Holder", "Trader 🔥🔥🔥", "👑 King of OTC 👑",
+    "User_123456789", "Satoshi N", "Ω Omega Ω", "ẞtraße Händler",
+]
+
+_local = threading.local()
+
+
+def name_pairs(n):
+    """N (buyer, seller) pairs cycled from the corpus"""
+    size = len(NAME_CORPUS)
+    return [
+        (NAME_CORPUS[i % size], NAME_CORPUS[(i * 7 + 3) % size])
+        for i in range(n)
+    ]
+
+
+def _generator(group_type):
+    """Uncached generator per thread (and per process)"""
+    generators = getattr(_local, "generators", None)
+    if generators is None:
+        generators = _local.generators = {}
+    if group_type not in generators:
+        generators[group_type] = LogoGenerator(group_type=group_type)
+    return generators[group_type]
+
+
+def timed_render(group_type, buyer_text, seller_text):
+    """Render one logo, returning (seconds, bytes)"""
+    generator = _generator(group_type)
+    started = time.perf_counter()
+    success, image_bytes, message = generator.generate_logo(buyer_text, seller_text)
+    elapsed = time.perf_counter() - started
+    if not success:
+        raise RuntimeError(message)
+    return elapsed, image_bytes.getvalue()
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def peak_rss_kb(include_children=False):
+    """Peak resident set size in KB (max of self and, optionally, children)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if include_children:
+        peak = max(peak, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # macOS reports bytes, Linux reports KB
+    if sys.platform == "darwin":
+        peak //= 1024
+    return peak
+
+
+def run_mode(mode, pairs, group_type, workers):
+    """Render every pair in one mode and collect timings"""
+    # Warm up resources so the first render does not skew latency
+    timed_render(group_type, *pairs[0])
+
+    started = time.perf_counter()
+    if mode == "single":
+        results = [timed_render(group_type, buyer, seller) for buyer, seller in pairs]
+    elif mode == "thread":
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(
+                timed_render, [group_type] * len(pairs), *zip(*pairs)
+            ))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            # One render per worker first so process start-up is not measured
+            list(executor.map(timed_render, [group_type] * workers, *zip(*pairs[:1] * workers)))
+            started = time.perf_counter()
+            results = list(executor.map(
+                timed_render, [group_type] * len(pairs), *zip(*pairs), chunksize=4
+            ))
+    wall = time.perf_counter() - started
+
+    latencies = [elapsed * 1000 for elapsed, _ in results]
+    sizes = [len(data) for _, data in results]
+
+    report = {
+        "mode": mode,
+        "workers": 1 if mode == "single" else workers,
+        "renders": len(pairs),
+        "wall_s": round(wall, 4),
+        "throughput_per_s": round(len(pairs) / wall, 2) if wall else None,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 3),
+            "p99": round(percentile(latencies, 99), 3),
+            "mean": round(sum(latencies) / len(latencies), 3),
+            "max": round(max(latencies), 3)
+        },
+        "bytes": {
+            "total": sum(sizes),
+            "mean": round(sum(sizes) / len(sizes), 1),
+            "min": min(sizes),
+            "max": max(sizes)
+        },
+        "peak_rss_kb": peak_rss_kb(include_children=mode == "process")
+    }
+    return report, [data for _, data in results]
+
+
+def write_outputs(out_dir, pairs, outputs):
+    """Save every rendered logo of a batch"""
+    os.makedirs(out_dir, exist_ok=True)
+    files = [f"logo_{i:05d}.{image_extension(data)}" for i, data in enumerate(outputs)]
+    for name, data in zip(files, outputs):
+        with open(os.path.join(out_dir, name), "wb") as f:
+            f.write(data)
+    with open(os.path.join(out_dir, "index.json"), "w") as f:
+        json.dump(
+            [{"file": name, "buyer": b, "seller": s} for name, (b, s) in zip(files, pairs)],
+            f, indent=2, ensure_ascii=False
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark escrow logo rendering")
+    parser.add_argument("-n", type=int, default=200, help="logos to render per mode")
+    parser.add_argument("--mode", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--group-type", default="p2p", choices=["p2p", "other"])
+    parser.add_argument("--json", metavar="PATH", help="write results as JSON ('-' for stdout)")
+    parser.add_argument("--out-dir", help="also save the rendered logos (first mode only)")
+    args = parser.parse_args(argv)
+
+    pairs = name_pairs(max(1, args.n))
+    reports = []
+
+    try:
+        for i, mode in enumerate(args.mode):
+            report, outputs = run_mode(mode, pairs, args.group_type, max(1, args.workers))
+            reports.append(report)
+            if args.out_dir and i == 0:
+                write_outputs(args.out_dir, pairs, outputs)
+    except RuntimeError as e:
+        print(f"❌ Render failed: {e}")
+        return 1
+
+    result = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "group_type": args.group_type,
+        "results": reports
+    }
+
+    if args.json == "-":
+        print(json.dumps(result, indent=2))
+    else:
+        for report in reports:
+            print(
+                f"{report['mode']:>7} x{report['workers']:<3} "
+                f"{report['throughput_per_s']:>8} logos/s  "
+                f"p50 {report['latency_ms']['p50']:>7} ms  "
+                f"p99 {report['latency_ms']['p99']:>7} ms  "
+                f"avg {report['bytes']['mean']:>8} B  "
+                f"rss {report['peak_rss_kb']} KB"
+            )
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump(result, f, indent=2)
+            print(f"✅ Results saved as {args.json}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
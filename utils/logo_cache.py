@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Cache of rendered escrow logos in memory and on disk
+"""
+import os
+import threading
+from collections import OrderedDict
+from config import LOGO_CACHE_ITEMS, LOGO_CACHE_DIR, LOGO_CACHE_DISK_BYTES
+
+
+class LogoCache:
+    """
+    LRU memory cache backed by a size-bounded directory
+
+    Entries are addressed by a layout hash (template, font, config, group
+    type) and a content hash (buyer, seller), so a layout change can drop
+    every entry rendered with it at once.
+    """
+
+    def __init__(self, max_items=LOGO_CACHE_ITEMS, disk_dir=LOGO_CACHE_DIR, max_disk_bytes=LOGO_CACHE_DISK_BYTES):
+        self.max_items = max_items
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes = None
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _path(self, layout, key):
+        return os.path.join(self.disk_dir, f"{layout}-{key}.bin")
+
+    def get(self, layout, key):
+        """Cached logo bytes, or None"""
+        with self._lock:
+            data = self._memory.get((layout, key))
+            if data is not None:
+                self._memory.move_to_end((layout, key))
+                self.hits += 1
+                return data
+
+        path = self._path(layout, key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            # Refresh mtime so disk eviction stays least-recently-used
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.disk_hits += 1
+            self._remember(layout, key, data)
+        return data
+
+    def put(self, layout, key, data):
+        """Store rendered logo bytes"""
+        with self._lock:
+            self._remember(layout, key, data)
+
+        if self.max_disk_bytes <= 0:
+            return
+        try:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            path = self._path(layout, key)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            with self._lock:
+                if self._disk_bytes is not None:
+                    self._disk_bytes += len(data)
+            self._trim_disk()
+        except OSError as e:
+            print(f"[CACHE] Could not write logo cache: {e}")
+
+    def _remember(self, layout, key, data):
+        """Insert into the memory LRU (lock held)"""
+        self._memory[(layout, key)] = data
+        self._memory.move_to_end((layout, key))
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def _disk_entries(self):
+        entries = []
+        for name in os.listdir(self.disk_dir):
+            if not name.endswith(".bin"):
+                continue
+            path = os.path.join(self.disk_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _trim_disk(self):
+        """Delete least recently used files until the directory fits its budget"""
+        with self._lock:
+            if self._disk_bytes is not None and self._disk_bytes <= self.max_disk_bytes:
+                return
+
+        entries = self._disk_entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                with self._lock:
+                    self.evictions += 1
+            except OSError:
+                pass
+
+        with self._lock:
+            self._disk_bytes = total
+
+    def invalidate(self, layout):
+        """Drop every entry rendered with a layout"""
+        with self._lock:
+            for entry in [k for k in self._memory if k[0] == layout]:
+                del self._memory[entry]
+            self._disk_bytes = None
+
+        if not os.path.isdir(self.disk_dir):
+            return
+        for name in os.listdir(self.disk_dir):
+            if name.startswith(f"{layout}-"):
+                try:
+                    os.remove(os.path.join(self.disk_dir, name))
+                except OSError:
+                    pass
+
+    def stats(self):
+        """Hit/miss counters"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "memory_items": len(self._memory)
+            }
+
+
+logo_cache = LogoCache()
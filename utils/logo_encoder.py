@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Size-optimized encoding of rendered logos
+"""
+import math
+from io import BytesIO
+from PIL import Image, ImageChops, ImageStat
+from config import (
+    LOGO_FORMATS, LOGO_PALETTE_COLORS, LOGO_PNG_COMPRESS_LEVEL,
+    LOGO_JPEG_QUALITY, LOGO_WEBP_QUALITY, LOGO_MAX_BYTES, LOGO_MIN_PSNR
+)
+
+# Magic bytes of the formats the encoder can produce
+_SIGNATURES = (
+    (b"\x89PNG", "png"),
+    (b"\xff\xd8", "jpg"),
+    (b"RIFF", "webp"),
+)
+
+
+def image_extension(data):
+    """File extension for encoded logo bytes"""
+    for signature, extension in _SIGNATURES:
+        if data.startswith(signature):
+            return extension
+    return "png"
+
+
+def psnr(original, candidate):
+    """Peak signal-to-noise ratio of a candidate against the original, in dB"""
+    if candidate.mode == "P" and "transparency" in candidate.info:
+        # Palette PNGs with a tRNS chunk must go through RGBA to convert cleanly
+        candidate = candidate.convert("RGBA")
+    diff = ImageChops.difference(original.convert("RGB"), candidate.convert("RGB"))
+    stat = ImageStat.Stat(diff)
+    mse = sum(stat.sum2) / (diff.size[0] * diff.size[1] * 3)
+    if mse == 0:
+        return math.inf
+    return 10 * math.log10(255 ** 2 / mse)
+
+
+class LogoEncoder:
+    """
+    Encodes a logo in the first configured format that is good enough
+
+    Lossy candidates are tried in order (palette PNG, JPEG, WebP) and the
+    first whose PSNR against the rendered image is at least min_psnr and
+    that fits max_bytes wins; the rest are never encoded. Lossless PNG is
+    the fallback, so encoding never costs more than a few extra saves.
+    """
+
+    def __init__(self, formats=LOGO_FORMATS, palette_colors=LOGO_PALETTE_COLORS,
+                 png_compress_level=LOGO_PNG_COMPRESS_LEVEL, jpeg_quality=LOGO_JPEG_QUALITY,
+                 webp_quality=LOGO_WEBP_QUALITY, max_bytes=LOGO_MAX_BYTES, min_psnr=LOGO_MIN_PSNR):
+        self.formats = [f.strip().lower() for f in formats if f.strip()]
+        self.palette_colors = palette_colors
+        self.png_compress_level = png_compress_level
+        self.jpeg_quality = jpeg_quality
+        self.webp_quality = webp_quality
+        self.max_bytes = max_bytes
+        self.min_psnr = min_psnr
+
+    def config_key(self):
+        """Settings that change the output, for cache addressing"""
+        return {
+            "formats": self.formats,
+            "palette_colors": self.palette_colors,
+            "png_compress_level": self.png_compress_level,
+            "jpeg_quality": self.jpeg_quality,
+            "webp_quality": self.webp_quality,
+            "max_bytes": self.max_bytes,
+            "min_psnr": self.min_psnr
+        }
+
+    @staticmethod
+    def _save(img, **params):
+        buffer = BytesIO()
+        img.save(buffer, **params)
+        return buffer.getvalue()
+
+    def _lossy_candidates(self, img):
+        """(name, bytes, image to compare or None) per lossy format, encoded lazily"""
+        # encode() has already flattened opaque RGBA, so RGBA means real transparency
+        has_alpha = img.mode == "RGBA"
+
+        if "png" in self.formats and self.palette_colors:
+            # FASTOCTREE is the only built-in method Pillow allows on RGBA,
+            # and on RGB it is several times faster than MEDIANCUT
+            quantized = img.quantize(colors=self.palette_colors, method=Image.Quantize.FASTOCTREE)
+            # PNG is lossless, so the palette image itself is what gets decoded
+            yield "png8", self._save(
+                quantized, format="PNG", compress_level=self.png_compress_level
+            ), quantized
+
+        # JPEG cannot carry transparency
+        if "jpeg" in self.formats and not has_alpha:
+            yield "jpeg", self._save(
+                img.convert("RGB"), format="JPEG", quality=self.jpeg_quality
+            ), None
+
+        if "webp" in self.formats:
+            yield "webp", self._save(img, format="WEBP", quality=self.webp_quality, method=4), None
+
+    def _fits(self, data):
+        return not self.max_bytes or len(data) <= self.max_bytes
+
+    def encode(self, img):
+        """
+        Encode a rendered logo
+
+        Returns:
+            tuple: (data: bytes, format name: str)
+        """
+        if img.mode == "RGBA" and img.getextrema()[3][0] == 255:
+            # Templates exported with an unused alpha channel are opaque
+            img = img.convert("RGB")
+
+        # Smallest candidate good enough on quality but over the byte budget
+        fallback = None
+
+        for name, data, decoded in self._lossy_candidates(img):
+            if decoded is None:
+                decoded = Image.open(BytesIO(data))
+            if psnr(img, decoded) < self.min_psnr:
+                continue
+            if self._fits(data):
+                return data, name
+            if fallback is None or len(data) < len(fallback[0]):
+                fallback = (data, name)
+
+        lossless = (self._save(img, format="PNG", compress_level=self.png_compress_level), "png")
+        if self._fits(lossless[0]) or fallback is None or len(lossless[0]) < len(fallback[0]):
+            return lossless
+        return fallback
@@ -2,13 +2,71 @@
 """
 Logo Generator for Escrow Groups
 """
+import hashlib
 import json
 from io import BytesIO
 from PIL import Image, ImageDraw, ImageFont
 import os
+import threading
+from config import LOGO_RENDER_MODE
+from utils.logo_encoder import LogoEncoder, image_extension
+
+DEFAULT_TEMPLATE = "assets/logo_template.png"
+
+# Appended to names cut at max_width
+ELLIPSIS = "..."
+
+class ResourceRegistry:
+    """Process-wide cache of fonts and templates, reloaded when a file changes"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._fonts = {}
+        self._templates = {}
+    
+    def font(self, path, size):
+        """Shared font for a path and size"""
+        mtime = os.stat(path).st_mtime_ns
+        with self._lock:
+            cached = self._fonts.get((path, size))
+            if cached and cached[0] == mtime:
+                return cached[1]
+            font = ImageFont.truetype(path, size)
+            self._fonts[(path, size)] = (mtime, font)
+            return font
+    
+    def template(self, path):
+        """Shared decoded template, already converted to its output mode"""
+        mtime = os.stat(path).st_mtime_ns
+        with self._lock:
+            cached = self._templates.get(path)
+            if cached and cached[0] == mtime:
+                return cached[1]
+            with Image.open(path) as source:
+                has_alpha = source.mode in ("RGBA", "LA", "PA") or "transparency" in source.info
+                template = source.convert("RGBA" if has_alpha else "RGB")
+            self._templates[path] = (mtime, template)
+            return template
+
+# Shared by every generator in the process
+resources = ResourceRegistry()
+
+def logo_file(data):
+    """File-like logo with a name Telegram can infer the type from"""
+    img_bytes = BytesIO(data)
+    img_bytes.name = f"logo.{image_extension(data)}"
+    return img_bytes
+
+def template_for(group_type, template_path=DEFAULT_TEMPLATE):
+    """Per-type template (e.g. assets/logo_template_otc.png) when one exists"""
+    if template_path != DEFAULT_TEMPLATE:
+        return template_path
+    root, ext = os.path.splitext(template_path)
+    typed_path = f"{root}_{group_type}{ext}"
+    return typed_path if os.path.exists(typed_path) else template_path
 
 class LogoGenerator:
-    def __init__(self, template_path="assets/logo_template.png", font_path="assets/Skynight.otf"):
+    def __init__(self, template_path=DEFAULT_TEMPLATE, font_path="assets/Skynight.otf", group_type="p2p", cache=None, encoder=None, render_mode=LOGO_RENDER_MODE):
         self.config = {
             "BUYER": {
                 "start_x": 250,
@@ -21,19 +79,30 @@ class LogoGenerator:
                 "max_width": 260
             }
         }
+        self.group_type = group_type
         self.font_size = 40
         self.font_path = font_path
-        self.image_path = template_path
+        self.image_path = template_for(group_type, template_path)
         self.baseline_fix = -12
         self.text_color = (0, 0, 0)  # BLACK
         self.font = None
         self.template = None
+        self.cache = cache
+        self.encoder = encoder or LogoEncoder()
+        self.render_mode = render_mode
+        
+        # Band rendering state
+        self._canvas = None
+        self._canvas_source = None
+        self._dirty_bands = []
+        self._glyph_font = None
+        self._glyph_widths = {}
         
         # Ensure assets directory exists
         os.makedirs("assets", exist_ok=True)
         
     def load_resources(self):
-        """Load font and template image"""
+        """Load font and template image from the shared registry"""
         try:
             # Check if files exist
             if not os.path.exists(self.font_path):
@@ -42,15 +111,42 @@ class LogoGenerator:
             if not os.path.exists(self.image_path):
                 return False, f"❌ Template image not found: {self.image_path}"
             
-            self.font = ImageFont.truetype(self.font_path, self.font_size)
-            self.template = Image.open(self.image_path)
+            self.font = resources.font(self.font_path, self.font_size)
+            self.template = resources.template(self.image_path)
             return True, "✅ Resources loaded"
         except Exception as e:
             return False, f"❌ Failed to load resources: {e}"
     
+    def layout_key(self):
+        """Hash of everything besides the names that affects the output"""
+        def fingerprint(path):
+            try:
+                stat = os.stat(path)
+                return [path, stat.st_mtime_ns, stat.st_size]
+            except OSError:
+                return [path, None, None]
+        
+        layout = {
+            "template": fingerprint(self.image_path),
+            "font": fingerprint(self.font_path),
+            "font_size": self.font_size,
+            "config": self.config,
+            "baseline_fix": self.baseline_fix,
+            "text_color": self.text_color,
+            "group_type": self.group_type,
+            "encoder": self.encoder.config_key()
+        }
+        encoded = json.dumps(layout, sort_keys=True).encode('utf-8')
+        return hashlib.sha256(encoded).hexdigest()[:16]
+    
+    def cache_key(self, buyer_text, seller_text):
+        """(layout, content) cache address of a logo"""
+        content = json.dumps([buyer_text, seller_text]).encode('utf-8')
+        return self.layout_key(), hashlib.sha256(content).hexdigest()[:32]
+    
     def generate_logo(self, buyer_text, seller_text):
         """
-        Generate logo with given usernames
+        Generate logo with given usernames, reusing cached renders
         
         Args:
             buyer_text: Buyer username (e.g., "@username")
@@ -59,47 +155,127 @@ class LogoGenerator:
         Returns:
             tuple: (success: bool, image_bytes: BytesIO or None, message: str)
         """
-        if not self.font or not self.template:
-            success, msg = self.load_resources()
-            if not success:
-                return False, None, msg
+        if self.cache is not None:
+            layout, key = self.cache_key(buyer_text, seller_text)
+            cached = self.cache.get(layout, key)
+            if cached is not None:
+                return True, logo_file(cached), "✅ Logo generated successfully"
+        
+        # Cheap when cached - only picks up changed files
+        success, msg = self.load_resources()
+        if not success:
+            return False, None, msg
         
         try:
-            # Create fresh copy of template
-            img = self.template.copy()
-            draw = ImageDraw.Draw(img)
+            buyer_text = self.fit_text(buyer_text, self.config["BUYER"].get("max_width"))
+            seller_text = self.fit_text(seller_text, self.config["SELLER"].get("max_width"))
             
-            # Get coordinates from config
-            buyer_x = self.config["BUYER"]["start_x"]
-            buyer_y = self.config["BUYER"]["start_y"]
-            seller_x = self.config["SELLER"]["start_x"]
-            seller_y = self.config["SELLER"]["start_y"]
+            if self.render_mode == "band":
+                img = self._render_bands([("BUYER", buyer_text), ("SELLER", seller_text)])
+            else:
+                img = self._render_full(buyer_text, seller_text)
             
-            # Draw text with baseline fix
-            draw.text(
-                (buyer_x, buyer_y + self.baseline_fix),
-                buyer_text,
-                font=self.font,
-                fill=self.text_color
-            )
+            # Convert to bytes in the smallest acceptable format
+            data, _ = self.encoder.encode(img)
+            img_bytes = logo_file(data)
             
-            draw.text(
-                (seller_x, seller_y + self.baseline_fix),
-                seller_text,
-                font=self.font,
-                fill=self.text_color
-            )
-            
-            # Convert to bytes
-            img_bytes = BytesIO()
-            img.save(img_bytes, format='PNG')
-            img_bytes.seek(0)
+            if self.cache is not None:
+                self.cache.put(layout, key, data)
             
             return True, img_bytes, "✅ Logo generated successfully"
             
         except Exception as e:
             return False, None, f"❌ Error generating logo: {e}"
     
+    def _render_full(self, buyer_text, seller_text):
+        """Draw both names on a fresh copy of the whole template"""
+        img = self.template.copy()
+        draw = ImageDraw.Draw(img)
+        
+        # Get coordinates from config
+        buyer_x = self.config["BUYER"]["start_x"]
+        buyer_y = self.config["BUYER"]["start_y"]
+        seller_x = self.config["SELLER"]["start_x"]
+        seller_y = self.config["SELLER"]["start_y"]
+        
+        # Draw text with baseline fix
+        draw.text(
+            (buyer_x, buyer_y + self.baseline_fix),
+            buyer_text,
+            font=self.font,
+            fill=self.text_color
+        )
+        
+        draw.text(
+            (seller_x, seller_y + self.baseline_fix),
+            seller_text,
+            font=self.font,
+            fill=self.text_color
+        )
+        return img
+    
+    def _render_bands(self, labels):
+        """
+        Draw names into their bands of a reusable canvas
+        
+        Only the bands touched by the previous render are restored from the
+        template instead of copying all of it, at the cost of measuring each
+        name. Text is drawn exactly as in full mode.
+        """
+        if self._canvas is None or self._canvas_source is not self.template:
+            self._canvas = self.template.copy()
+            self._canvas_source = self.template
+            self._dirty_bands = []
+        
+        canvas = self._canvas
+        
+        # Restore what the previous names covered
+        for box in self._dirty_bands:
+            canvas.paste(self.template.crop(box), box)
+        self._dirty_bands = []
+        
+        draw = ImageDraw.Draw(canvas)
+        for label, text in labels:
+            if not text:
+                continue
+            xy = (self.config[label]["start_x"], self.config[label]["start_y"] + self.baseline_fix)
+            left, top, right, bottom = draw.textbbox(xy, text, font=self.font)
+            box = (max(0, left), max(0, top), min(canvas.width, right), min(canvas.height, bottom))
+            if box[0] >= box[2] or box[1] >= box[3]:
+                continue
+            draw.text(xy, text, font=self.font, fill=self.text_color)
+            self._dirty_bands.append(box)
+        
+        return canvas
+    
+    def _glyph_width(self, char):
+        """Advance width of one character, measured once per font"""
+        if self._glyph_font is not self.font:
+            self._glyph_font = self.font
+            self._glyph_widths = {}
+        width = self._glyph_widths.get(char)
+        if width is None:
+            width = self.font.getlength(char)
+            self._glyph_widths[char] = width
+        return width
+    
+    def fit_text(self, text, max_width):
+        """Truncate text with an ellipsis so it fits max_width pixels"""
+        if not text or not max_width:
+            return text
+        
+        widths = [self._glyph_width(char) for char in text]
+        if sum(widths) <= max_width:
+            return text
+        
+        budget = max_width - sum(self._glyph_width(char) for char in ELLIPSIS)
+        used = 0
+        for i, width in enumerate(widths):
+            if used + width > budget:
+                return text[:i].rstrip() + ELLIPSIS
+            used += width
+        return text
+    
     def generate_and_save(self, buyer_text, seller_text, output_path="generated_logo.png"):
         """Generate logo and save to file"""
         success, image_bytes, message = self.generate_logo(buyer_text, seller_text)
@@ -127,6 +303,10 @@ class LogoGenerator:
             if "BUYER" not in new_config or "SELLER" not in new_config:
                 return False, "❌ Invalid config format"
             
+            # Drop renders made with the old layout
+            if self.cache is not None:
+                self.cache.invalidate(self.layout_key())
+            
             # Update config
             self.config = new_config
             return True, "✅ Configuration updated"
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Prometheus text-format metrics and a local HTTP endpoint to scrape them
+"""
+import asyncio
+import math
+import time
+from contextlib import contextmanager
+from config import METRICS_HOST, METRICS_PORT
+
+# Latency buckets in seconds, from a cached reply to a slow group setup
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self):
+        lines = self.header()
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, key)} {_number(value)}")
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        self._values[self._key(labels)] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        series = self._values.get(key)
+        if series is None:
+            series = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series["counts"][i] += 1
+                break
+        series["sum"] += value
+        series["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the block"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self):
+        lines = self.header()
+        for key, series in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series["counts"]):
+                cumulative += count
+                labels = _labels(self.labelnames, key, ("le", _number(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_number(series['sum'])}")
+            lines.append(f"{self.name}_count{labels} {series['count']}")
+        return lines
+
+
+class Registry:
+    """Metrics updated in place plus collectors read at scrape time"""
+
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collect):
+        """collect() returns metrics built from current state"""
+        self.collectors.append(collect)
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for collect in self.collectors:
+            try:
+                for metric in collect():
+                    lines.extend(metric.render())
+            except Exception as e:
+                print(f"[METRICS] Collector {getattr(collect, '__name__', collect)} failed: {e}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+HANDLER_SECONDS = registry.register(Histogram(
+    "escrow_handler_seconds", "Event handler latency", ["handler"]
+))
+CREATE_SECONDS = registry.register(Histogram(
+    "escrow_create_seconds", "Escrow group creation time, excluding queue wait", ["group_type", "outcome"]
+))
+CREATE_STEP_SECONDS = registry.register(Histogram(
+    "escrow_create_step_seconds", "Time of each group setup step", ["step", "outcome"]
+))
+JOB_WAIT_SECONDS = registry.register(Histogram(
+    "escrow_job_wait_seconds", "Time jobs waited for a slot", ["queue"]
+))
+JOB_SERVICE_SECONDS = registry.register(Histogram(
+    "escrow_job_service_seconds", "Time jobs ran once started", ["queue"]
+))
+LOGO_RENDER_SECONDS = registry.register(Histogram(
+    "escrow_logo_render_seconds", "Logo render time", ["source"]
+))
+STORE_SECONDS = registry.register(Histogram(
+    "escrow_store_seconds", "Group store read and write time", ["op"]
+))
+
+
+def _runtime_metrics():
+    """Gauges and counters from the stats() of the long-lived services"""
+    from utils.actors import group_actors
+    from utils.cleaner import service_cleaner
+    from utils.client_pool import user_pool
+    from utils.deleter import message_deleter
+    from utils.group_pool import group_pool
+    from utils.job_queue import creation_queue
+    from utils.log_shipper import log_shipper
+    from utils.logo_cache import logo_cache
+    from utils.render_service import logo_renderer
+    from utils.scheduler import request_scheduler
+    from utils.state import get_state
+
+    flood_waits = Counter("escrow_flood_waits_total", "FloodWait errors per client and method", ["client", "method"])
+    scheduled = Counter("escrow_requests_total", "Requests sent per client and lane", ["client", "lane"])
+    for client, gate in request_scheduler.stats().items():
+        for method, count in gate["flood_waits"].items():
+            flood_waits.inc(count, client=client, method=method)
+        for lane, count in gate["requests"].items():
+            scheduled.inc(count, client=client, lane=lane)
+
+    depth = Gauge("escrow_queue_depth", "Items waiting per queue", ["queue"])
+    depth.set(creation_queue.depth, queue="creation")
+    depth.set(log_shipper.stats()["queued"], queue="log_shipper")
+    depth.set(message_deleter.pending, queue="deleter")
+    depth.set(logo_renderer.pending, queue="logo_render")
+    for client, gate in request_scheduler.stats().items():
+        depth.set(gate["queued"], queue=f"scheduler_{client}")
+
+    creations = Gauge("escrow_creations_running", "Creation jobs running")
+    creations.set(creation_queue.running)
+    rejected = Counter("escrow_create_rejected_total", "Creation jobs rejected because the queue was full")
+    rejected.inc(creation_queue.rejected)
+
+    groups = get_state().groups
+    active = Gauge("escrow_groups", "Escrow groups known to the bot", ["state"])
+    active.set(len(groups), state="total")
+    active.set(sum(1 for g in groups.values() if g.get("session_initiated")), state="session_initiated")
+    actors = Gauge("escrow_group_actors_active", "Groups with queued or running work")
+    actors.set(group_actors.active)
+    ready = Gauge("escrow_group_pool_ready", "Pre-provisioned groups ready per type", ["group_type"])
+    for group_type, queue in group_pool.ready.items():
+        ready.set(len(queue), group_type=group_type)
+
+    healthy = Gauge("escrow_user_session_healthy", "1 when a user session is connected", ["session"])
+    in_use = Gauge("escrow_user_session_in_use", "Operations holding a user session", ["session"])
+    cooldown = Gauge("escrow_user_session_cooldown_seconds", "FloodWait cooldown left per session", ["session"])
+    for name, member in user_pool.stats().items():
+        healthy.set(member["healthy"], session=name)
+        in_use.set(member["in_use"], session=name)
+        cooldown.set(member["cooldown_remaining"], session=name)
+
+    logos = Counter("escrow_logo_cache_total", "Logo cache lookups by outcome", ["outcome"])
+    cache = logo_cache.stats()
+    for outcome in ("hits", "disk_hits", "misses", "evictions"):
+        logos.inc(cache[outcome], outcome=outcome)
+
+    log_stats = log_shipper.stats()
+    shipped = Counter("escrow_log_records_total", "Channel log records by outcome", ["outcome"])
+    for outcome in ("shipped", "spooled", "replayed"):
+        shipped.inc(log_stats[outcome], outcome=outcome)
+
+    removed = Counter("escrow_service_messages_removed_total", "Service messages deleted per kind", ["kind"])
+    for kind, count in service_cleaner.stats()["removed"].items():
+        removed.inc(count, kind=kind)
+
+    return [
+        flood_waits, scheduled, depth, creations, rejected, active, actors,
+        ready, healthy, in_use, cooldown, logos, shipped, removed
+    ]
+
+
+registry.add_collector(_runtime_metrics)
+
+
+class MetricsServer:
+    """Serves GET /metrics over plain HTTP with asyncio streams"""
+
+    def __init__(self, registry=registry, host=METRICS_HOST, port=METRICS_PORT):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._server = None
+
+    async def start(self):
+        """Listen unless the port is 0; the bot runs on without metrics if it cannot"""
+        if not self.port or self._server:
+            return
+        try:
+            self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        except OSError as e:
+            print(f"[METRICS] Not serving metrics on {self.host}:{self.port}: {e}")
+            return
+        print(f"[METRICS] Serving http://{self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader, writer):
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+            # Drain headers; the request has no body we care about
+            while True:
+                line = await asyncio.wait_for(reader.readline(), timeout=5)
+                if line in (b"\r\n", b"\n", b""):
+                    break
+
+            parts = request_line.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+                status = "200 OK"
+                body = self.registry.render().encode("utf-8")
+                content_type = "text/plain; version=0.0.4; charset=utf-8"
+            else:
+                status = "404 Not Found"
+                body = b"Not found\n"
+                content_type = "text/plain; charset=utf-8"
+
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+metrics_server = MetricsServer()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Throttled status message updates while work runs
+"""
+import asyncio
+import time
+from config import CREATE_PROGRESS_INTERVAL
+from utils.scheduler import request_lane, INTERACTIVE
+
+
+class ProgressMessage:
+    """
+    Edits a callback's message as steps complete
+
+    step() never waits on Telegram: edits run in a background task, at most
+    one per `interval`, and only the latest state is sent. close() drops any
+    edit that has not started, so it cannot land after the final message.
+    """
+
+    def __init__(self, event, render, interval=CREATE_PROGRESS_INTERVAL):
+        self.event = event
+        self.render = render
+        self.interval = interval
+        self.done = set()
+        self.position = None
+        self.edits = 0
+        self._dirty = False
+        self._closed = False
+        self._editing = False
+        self._last = 0
+        self._task = None
+
+    def start(self):
+        """Show the initial status"""
+        self._schedule()
+
+    def queued(self, position):
+        """Show the queue position, 0 once the work has started"""
+        self.position = position or None
+        self._schedule()
+
+    def step(self, name):
+        """Mark a step complete"""
+        if name in self.done:
+            return
+        self.done.add(name)
+        self._schedule()
+
+    def _schedule(self):
+        if self._closed:
+            return
+        self._dirty = True
+        if self._task is None or self._task.done():
+            # Status edits answer the user, not the setup work that reports them
+            with request_lane(INTERACTIVE):
+                self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while self._dirty and not self._closed:
+            delay = self._last + self.interval - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+
+            self._dirty = False
+            self._last = time.monotonic()
+            self._editing = True
+            try:
+                await self.event.edit(self.render(set(self.done), self.position), parse_mode='html')
+                self.edits += 1
+            except Exception as e:
+                print(f"[PROGRESS] Edit failed: {e}")
+            finally:
+                self._editing = False
+
+    async def close(self):
+        """Stop updating; an edit already in flight is allowed to finish"""
+        self._closed = True
+        task = self._task
+        if task is None or task.done():
+            return
+        if not self._editing:
+            task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Logo rendering off the event loop in a process pool
+"""
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from config import LOGO_RENDER_WORKERS, LOGO_RENDER_QUEUE, LOGO_RENDER_TIMEOUT
+from utils.logo_cache import logo_cache
+from utils.logo_generator import LogoGenerator, logo_file
+from utils.metrics import LOGO_RENDER_SECONDS
+
+GROUP_TYPES = ("p2p", "other")
+
+# Generators preloaded in each worker process
+_generators = {}
+
+
+def _init_worker():
+    """Load fonts and templates once per worker"""
+    for group_type in GROUP_TYPES:
+        generator = LogoGenerator(group_type=group_type)
+        success, message = generator.load_resources()
+        if not success:
+            print(f"[RENDER] {group_type}: {message}")
+        _generators[group_type] = generator
+
+
+def _render(group_type, buyer_text, seller_text):
+    """Render one logo inside a worker"""
+    generator = _generators.get(group_type)
+    if generator is None:
+        generator = LogoGenerator(group_type=group_type)
+        _generators[group_type] = generator
+
+    success, image_bytes, message = generator.generate_logo(buyer_text, seller_text)
+    return success, image_bytes.getvalue() if success else None, message
+
+
+class LogoRenderService:
+    """Async front end for CPU-bound logo rendering"""
+
+    def __init__(self, workers=LOGO_RENDER_WORKERS, max_pending=LOGO_RENDER_QUEUE, timeout=LOGO_RENDER_TIMEOUT, cache=logo_cache):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.pending = 0
+        self.cache = cache
+        self._executor = None
+        self._generators = {}
+
+    def _generator(self, group_type):
+        """Main-process generator, only used to address the cache"""
+        generator = self._generators.get(group_type)
+        if generator is None:
+            generator = LogoGenerator(group_type=group_type)
+            self._generators[group_type] = generator
+        return generator
+
+    def start(self):
+        """Spawn the worker processes"""
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker
+            )
+
+    def stop(self):
+        """Shut the workers down without waiting for queued renders"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _finished(self, loop):
+        """Executor callback, run off the loop once a render is done with its worker"""
+        def release():
+            self.pending -= 1
+        try:
+            loop.call_soon_threadsafe(release)
+        except RuntimeError:
+            # Loop already closed at shutdown
+            pass
+
+    async def render_logo(self, group_type, buyer_text, seller_text):
+        """
+        Render a logo in a worker process
+
+        Returns:
+            tuple: (success: bool, image_bytes: BytesIO or None, message: str)
+        """
+        # Serve repeat buyer/seller pairs without a worker round trip
+        layout, key = self._generator(group_type).cache_key(buyer_text, seller_text)
+        started = time.perf_counter()
+        # The disk tier reads, touches and scans files - keep it off the loop
+        cached = await asyncio.to_thread(self.cache.get, layout, key)
+        if cached is not None:
+            LOGO_RENDER_SECONDS.observe(time.perf_counter() - started, source="cache")
+            return True, logo_file(cached), "✅ Logo generated successfully"
+
+        if self.pending >= self.max_pending:
+            return False, None, "❌ Logo render queue is full"
+
+        self.start()
+        loop = asyncio.get_running_loop()
+        try:
+            future = self._executor.submit(_render, group_type, buyer_text, seller_text)
+        except Exception as e:
+            return False, None, f"❌ Logo render failed: {e}"
+
+        # A timed-out render keeps its worker busy, so it stays counted
+        # until the worker is done with it, not until we stop waiting
+        self.pending += 1
+        future.add_done_callback(lambda _: self._finished(loop))
+        try:
+            success, data, message = await asyncio.wait_for(
+                asyncio.wrap_future(future),
+                timeout=self.timeout
+            )
+        except asyncio.TimeoutError:
+            return False, None, f"❌ Logo render timed out after {self.timeout}s"
+        except Exception as e:
+            return False, None, f"❌ Logo render failed: {e}"
+
+        if not success:
+            return False, None, message
+        LOGO_RENDER_SECONDS.observe(time.perf_counter() - started, source="worker")
+        await asyncio.to_thread(self.cache.put, layout, key, data)
+        return True, logo_file(data), message
+
+
+logo_renderer = LogoRenderService()
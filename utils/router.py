@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Single dispatcher for inline button callbacks
+"""
+import time
+from telethon import events
+from utils.scheduler import request_lane, INTERACTIVE
+from utils.metrics import HANDLER_SECONDS
+
+# Payloads with arguments are "<version>:<action>:<arg>:..."; bare words are plain actions
+CALLBACK_VERSION = "1"
+SEPARATOR = ":"
+
+# Telegram limit for callback data
+MAX_CALLBACK_BYTES = 64
+
+# Role buttons sent before versioned payloads existed
+LEGACY_ROLE_PREFIXES = {"role_buyer_": "buyer", "role_seller_": "seller"}
+
+
+def encode_callback(action, *args):
+    """Callback data for an action and its arguments"""
+    if not args:
+        payload = action
+    else:
+        payload = SEPARATOR.join([CALLBACK_VERSION, action] + [str(arg) for arg in args])
+
+    data = payload.encode('utf-8')
+    if len(data) > MAX_CALLBACK_BYTES:
+        raise ValueError(f"Callback data too long ({len(data)} bytes): {payload}")
+    return data
+
+
+def parse_callback(data):
+    """
+    Split callback data into its action and arguments
+
+    Returns:
+        tuple: (action or None, args list)
+    """
+    text = data.decode('utf-8', errors='replace')
+
+    if SEPARATOR in text:
+        version, _, rest = text.partition(SEPARATOR)
+        if version != CALLBACK_VERSION:
+            return None, []
+        action, *args = rest.split(SEPARATOR)
+        return action, args
+
+    for prefix, role in LEGACY_ROLE_PREFIXES.items():
+        if text.startswith(prefix):
+            return "role", [role, text[len(prefix):]]
+
+    return text, []
+
+
+class CallbackRouter:
+    """Parses each callback once and routes it with a dict lookup"""
+
+    def __init__(self):
+        self.routes = {}
+        self.timings = {}
+
+    def add(self, action, handler, args=0):
+        """Route an action carrying exactly `args` arguments to handler(event, *args)"""
+        self.routes[action] = (handler, args)
+
+    def register(self, client):
+        """Attach the dispatcher as the only callback handler"""
+        client.add_event_handler(self.dispatch, events.CallbackQuery())
+
+    async def dispatch(self, event):
+        action, args = parse_callback(event.data or b"")
+        route = self.routes.get(action)
+        if route is None:
+            return
+
+        handler, expected = route
+        if len(args) != expected:
+            # Malformed or stale payload - stop the button spinner, call nothing
+            from utils.texts import INVALID_BUTTON_ALERT
+            try:
+                await event.answer(INVALID_BUTTON_ALERT)
+            except Exception as e:
+                print(f"[ROUTER] Could not answer {action}: {e}")
+            return
+
+        started = time.perf_counter()
+        try:
+            # Button responses go ahead of background requests
+            with request_lane(INTERACTIVE):
+                await handler(event, *args)
+        finally:
+            self._record(action, time.perf_counter() - started)
+
+    def _record(self, action, elapsed):
+        HANDLER_SECONDS.observe(elapsed, handler=f"callback:{action}")
+        timing = self.timings.get(action)
+        if timing is None:
+            timing = self.timings[action] = {"count": 0, "total": 0.0, "max": 0.0}
+        timing["count"] += 1
+        timing["total"] += elapsed
+        timing["max"] = max(timing["max"], elapsed)
+
+    def stats(self):
+        """Calls and timings per route"""
+        return {
+            action: {
+                "count": t["count"],
+                "avg_ms": round(t["total"] / t["count"] * 1000, 1),
+                "max_ms": round(t["max"] * 1000, 1)
+            }
+            for action, t in self.timings.items()
+        }
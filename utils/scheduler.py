@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+FloodWait-aware scheduling of outgoing Telegram requests
+"""
+import asyncio
+import contextvars
+import heapq
+import itertools
+import time
+from contextlib import contextmanager
+from telethon import TelegramClient
+from telethon.errors import FloodWaitError
+from config import (
+    SCHEDULER_RATE, SCHEDULER_BURST,
+    SCHEDULER_MAX_FLOOD_WAIT, SCHEDULER_INTERACTIVE_MAX_WAIT
+)
+
+# Priority lanes, lowest value goes first
+INTERACTIVE = 0
+NORMAL = 1
+BACKGROUND = 2
+LANE_NAMES = {INTERACTIVE: "interactive", NORMAL: "normal", BACKGROUND: "background"}
+
+# Per-method (requests per second, burst) on each client
+METHOD_LIMITS = {
+    "CreateChannelRequest": (0.2, 3),
+    "InviteToChannelRequest": (0.5, 3),
+    "EditAdminRequest": (1, 5),
+    "EditTitleRequest": (0.5, 3),
+    "ExportChatInviteRequest": (0.5, 3),
+    "UpdatePinnedMessageRequest": (1, 3),
+    "SendMessageRequest": (20, 30),
+    "SendMediaRequest": (5, 10),
+    "EditMessageRequest": (10, 20),
+    "DeleteMessagesRequest": (5, 10),
+}
+
+# FloodWaits retried before the error reaches the caller
+MAX_FLOOD_RETRIES = 2
+
+_lane = contextvars.ContextVar("request_lane", default=NORMAL)
+
+
+@contextmanager
+def request_lane(lane):
+    """Run the block's requests, and tasks it creates, in a priority lane"""
+    token = _lane.set(lane)
+    try:
+        yield
+    finally:
+        _lane.reset(token)
+
+
+class TokenBucket:
+    """Refills `rate` tokens per second up to `capacity`"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self):
+        """Seconds until a token is available"""
+        self._refill()
+        if self.tokens >= 1:
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        self._refill()
+        self.tokens -= 1
+
+
+class ClientGate:
+    """
+    Admission control for one client
+
+    Method limits and FloodWait blocks apply per method. The client-wide
+    bucket hands out tokens to waiters in lane order, FIFO within a lane.
+    """
+
+    def __init__(self, label, rate, burst, method_limits):
+        self.label = label
+        self.bucket = TokenBucket(rate, burst)
+        self.method_limits = method_limits
+        self.methods = {}
+        self.blocked = {}
+        self.waiters = []
+        self._seq = itertools.count()
+        self._pump = None
+
+        self.requests = {name: 0 for name in LANE_NAMES.values()}
+        self.waited = {name: 0.0 for name in LANE_NAMES.values()}
+        self.flood_waits = {}
+
+    def block(self, method, seconds):
+        """Hold back a method until its FloodWait is over"""
+        until = time.monotonic() + seconds
+        self.blocked[method] = max(self.blocked.get(method, 0), until)
+        self.flood_waits[method] = self.flood_waits.get(method, 0) + 1
+
+    async def _method_slot(self, method):
+        bucket = self.methods.get(method)
+        if bucket is None and method in self.method_limits:
+            bucket = self.methods[method] = TokenBucket(*self.method_limits[method])
+
+        while True:
+            wait = self.blocked.get(method, 0) - time.monotonic()
+            if bucket is not None:
+                wait = max(wait, bucket.delay())
+            if wait <= 0:
+                break
+            await asyncio.sleep(wait)
+
+        if bucket is not None:
+            bucket.take()
+
+    async def acquire(self, lane, method):
+        """Wait for permission to send one request"""
+        started = time.monotonic()
+        await self._method_slot(method)
+
+        if not self.waiters and self.bucket.delay() == 0:
+            self.bucket.take()
+        else:
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self.waiters, (lane, next(self._seq), future))
+            if self._pump is None:
+                self._pump = asyncio.create_task(self._run_pump())
+            await future
+
+        name = LANE_NAMES[lane]
+        self.requests[name] += 1
+        self.waited[name] += time.monotonic() - started
+
+    async def _run_pump(self):
+        """Release queued waiters as tokens become available"""
+        try:
+            while self.waiters:
+                delay = self.bucket.delay()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                    continue
+                _, _, future = heapq.heappop(self.waiters)
+                # Skip callers that gave up while queued
+                if future.done():
+                    continue
+                self.bucket.take()
+                future.set_result(None)
+        finally:
+            self._pump = None
+
+    def stats(self):
+        return {
+            "queued": len(self.waiters),
+            "requests": dict(self.requests),
+            "avg_wait_ms": {
+                name: round(self.waited[name] / count * 1000, 1) if count else 0
+                for name, count in self.requests.items()
+            },
+            "flood_waits": dict(self.flood_waits)
+        }
+
+
+class RequestScheduler:
+    """Paces every client's requests and sits out short FloodWaits"""
+
+    def __init__(self, rate=SCHEDULER_RATE, burst=SCHEDULER_BURST,
+                 max_flood_wait=SCHEDULER_MAX_FLOOD_WAIT,
+                 interactive_max_wait=SCHEDULER_INTERACTIVE_MAX_WAIT,
+                 method_limits=METHOD_LIMITS):
+        self.rate = rate
+        self.burst = burst
+        self.max_flood_wait = max_flood_wait
+        self.interactive_max_wait = interactive_max_wait
+        self.method_limits = method_limits
+        self.gates = {}
+
+    def gate(self, client):
+        gate = self.gates.get(client)
+        if gate is None:
+            label = getattr(client, "label", None) or f"client{len(self.gates) + 1}"
+            gate = self.gates[client] = ClientGate(label, self.rate, self.burst, self.method_limits)
+        return gate
+
+    async def call(self, client, request, send):
+        """Run `await send()` for a request once the client may send it"""
+        method = type(request[0] if isinstance(request, list) else request).__name__
+        lane = _lane.get()
+        gate = self.gate(client)
+        limit = self.interactive_max_wait if lane == INTERACTIVE else self.max_flood_wait
+
+        for attempt in range(MAX_FLOOD_RETRIES + 1):
+            await gate.acquire(lane, method)
+            try:
+                return await send()
+            except FloodWaitError as e:
+                gate.block(method, e.seconds)
+                # Lets a client owner (the user pool) steer new work elsewhere
+                on_flood_wait = getattr(client, "on_flood_wait", None)
+                if on_flood_wait:
+                    on_flood_wait(method, e.seconds)
+                if e.seconds > limit or attempt == MAX_FLOOD_RETRIES:
+                    raise
+                print(f"[SCHED] {gate.label} FloodWait {e.seconds}s on {method}, waiting")
+
+    def stats(self):
+        """Per-client lane counts, waits and FloodWaits"""
+        return {gate.label: gate.stats() for gate in self.gates.values()}
+
+
+request_scheduler = RequestScheduler()
+
+
+class ScheduledClient(TelegramClient):
+    """TelegramClient whose requests all go through the scheduler"""
+
+    def __init__(self, *args, label=None, scheduler=request_scheduler, **kwargs):
+        # FloodWaits are handled by the scheduler, not slept inside Telethon
+        kwargs.setdefault("flood_sleep_threshold", 0)
+        super().__init__(*args, **kwargs)
+        self.label = label
+        self.scheduler = scheduler
+        # Optional callback(method, seconds) run when a FloodWait hits this client
+        self.on_flood_wait = None
+
+    async def __call__(self, request, ordered=False, flood_sleep_threshold=None):
+        return await self.scheduler.call(
+            self, request,
+            lambda: TelegramClient.__call__(self, request, ordered, flood_sleep_threshold)
+        )
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Group numbering reserved from disk in blocks
+"""
+import json
+import os
+import threading
+from config import COUNTER_FILE, SEQUENCE_BLOCK_SIZE
+
+
+class SequenceService:
+    """
+    Hands out per-type group numbers from memory
+
+    The counter file records, per type, the first number that has not been
+    reserved yet. Numbers are reserved a block at a time, so the file is
+    only rewritten once per block and a restart resumes after the last
+    reserved block. Unused numbers of that block are skipped, never reused.
+    """
+
+    def __init__(self, path=COUNTER_FILE, block_size=SEQUENCE_BLOCK_SIZE):
+        self.path = path
+        self.block_size = max(1, block_size)
+        self._lock = threading.Lock()
+        self._reserved = self._load()
+        self._next = dict(self._reserved)
+
+    def _load(self):
+        """Reserved limits from the last checkpoint"""
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, 'r') as f:
+            return {key: int(value) for key, value in json.load(f).items()}
+
+    def _checkpoint(self):
+        """Atomically replace the counter file with the reserved limits"""
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self._reserved, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def next(self, group_type="p2p"):
+        """Next unique number for a group type"""
+        with self._lock:
+            number = self._next.get(group_type, 1)
+
+            if number >= self._reserved.get(group_type, 1):
+                previous = self._reserved.get(group_type)
+                self._reserved[group_type] = number + self.block_size
+                try:
+                    self._checkpoint()
+                except Exception:
+                    # Never hand out a number that is not safely reserved
+                    if previous is None:
+                        self._reserved.pop(group_type)
+                    else:
+                        self._reserved[group_type] = previous
+                    raise
+
+            self._next[group_type] = number + 1
+            return number
+
+
+sequence = SequenceService()
+
+
+def get_next_number(group_type="p2p"):
+    """Get next sequential group number"""
+    return sequence.next(group_type)
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+In-memory bot state with lookup indexes and write-behind persistence
+"""
+import asyncio
+import copy
+from config import STATE_FLUSH_INTERVAL
+from utils.store import get_store
+from utils.metrics import STORE_SECONDS
+
+
+def clean_chat_id(chat_id):
+    """Chat id without the -100 channel prefix"""
+    chat_id = str(chat_id)
+    if chat_id.startswith('-100'):
+        return chat_id[4:]
+    return chat_id
+
+
+class GroupIndex:
+    """Maps clean chat id, original id and title to group keys"""
+
+    def __init__(self):
+        self.by_chat_id = {}
+        self.by_original_id = {}
+        self.by_title = {}
+        self._entries = {}
+
+    def add(self, group_key, data):
+        """Index a group record, replacing its previous entries"""
+        group_key = str(group_key)
+        self.remove(group_key)
+
+        chat_id = clean_chat_id(group_key)
+        original_id = data.get("original_id")
+        title = data.get("name")
+
+        self.by_chat_id[chat_id] = group_key
+        if original_id:
+            self.by_original_id[str(original_id)] = group_key
+        if title:
+            self.by_title.setdefault(title, set()).add(group_key)
+        self._entries[group_key] = (chat_id, original_id, title)
+
+    def remove(self, group_key):
+        """Drop every entry of a group key"""
+        entry = self._entries.pop(str(group_key), None)
+        if not entry:
+            return
+        chat_id, original_id, title = entry
+        self.by_chat_id.pop(chat_id, None)
+        if original_id:
+            self.by_original_id.pop(str(original_id), None)
+        if title:
+            keys = self.by_title.get(title)
+            if keys:
+                keys.discard(str(group_key))
+                if not keys:
+                    del self.by_title[title]
+
+    def lookup(self, chat_id=None, title=None):
+        """
+        Resolve a group key by chat id, then by title
+
+        Returns:
+            tuple: (group_key or None, title matches when ambiguous)
+        """
+        if chat_id is not None:
+            key = (
+                self.by_chat_id.get(clean_chat_id(chat_id))
+                or self.by_original_id.get(str(chat_id))
+            )
+            if key:
+                return key, None
+
+        if title:
+            keys = self.by_title.get(title)
+            if keys and len(keys) == 1:
+                return next(iter(keys)), None
+            if keys:
+                return None, sorted(keys)
+
+        return None, None
+
+
+class BotState:
+    """
+    Group and role state shared by all handlers
+
+    Reads are served from memory. Writes update memory immediately and are
+    coalesced into one debounced flush to the store per interval, off the
+    event loop.
+    """
+
+    def __init__(self, store, flush_interval=STATE_FLUSH_INTERVAL):
+        self.store = store
+        self.flush_interval = flush_interval
+        with STORE_SECONDS.time(op="load"):
+            self.groups = store.all_groups()
+            self.roles = store.all_roles()
+        self.index = GroupIndex()
+        for group_key, data in self.groups.items():
+            self.index.add(group_key, data)
+
+        self._dirty_groups = set()
+        self._dirty_roles = set()
+        self._flush_task = None
+        self._flush_lock = asyncio.Lock()
+
+    def get_group(self, group_key):
+        data = self.groups.get(str(group_key))
+        return copy.deepcopy(data) if data is not None else None
+
+    def find_group(self, chat_id=None, title=None):
+        """
+        Find a group by chat id, falling back to its title
+
+        Returns:
+            tuple: (group_key, group_data) or (None, None)
+        """
+        group_key, ambiguous = self.index.lookup(chat_id, title)
+        if ambiguous:
+            print(f"[WARNING] Title '{title}' matches {len(ambiguous)} groups: {', '.join(ambiguous)}")
+            return None, None
+        if not group_key:
+            return None, None
+        return group_key, self.get_group(group_key)
+
+    def is_managed(self, chat_id):
+        """Whether a chat is one of our escrow groups"""
+        return chat_id is not None and clean_chat_id(chat_id) in self.index.by_chat_id
+
+    def put_group(self, group_key, data):
+        group_key = str(group_key)
+        self.groups[group_key] = copy.deepcopy(data)
+        self.index.add(group_key, data)
+        self._dirty_groups.add(group_key)
+        self._schedule_flush()
+
+    def get_roles(self, group_key):
+        return copy.deepcopy(self.roles.get(str(group_key), {}))
+
+    def put_role(self, group_key, user_id, data):
+        group_key, user_id = str(group_key), str(user_id)
+        self.roles.setdefault(group_key, {})[user_id] = copy.deepcopy(data)
+        self._dirty_roles.add((group_key, user_id))
+        self._schedule_flush()
+
+    def _schedule_flush(self):
+        """Start the debounce timer unless a flush is already pending"""
+        if self._flush_task is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop (scripts, shutdown) - write through
+            self._write(*self._take_dirty())
+            return
+        self._flush_task = loop.create_task(self._delayed_flush())
+
+    async def _delayed_flush(self):
+        await asyncio.sleep(self.flush_interval)
+        self._flush_task = None
+        await self.flush()
+
+    def _take_dirty(self):
+        """Snapshot and clear the dirty records"""
+        groups = {key: copy.deepcopy(self.groups[key]) for key in self._dirty_groups}
+        roles = {
+            (group_key, user_id): copy.deepcopy(self.roles[group_key][user_id])
+            for group_key, user_id in self._dirty_roles
+        }
+        self._dirty_groups.clear()
+        self._dirty_roles.clear()
+        return groups, roles
+
+    def _write(self, groups, roles):
+        """Write a snapshot to the store in one transaction"""
+        if not groups and not roles:
+            return
+        with STORE_SECONDS.time(op="flush"), self.store.transaction():
+            for group_key, data in groups.items():
+                self.store.put_group(group_key, data)
+            for (group_key, user_id), data in roles.items():
+                self.store.put_role(group_key, user_id, data)
+
+    async def flush(self):
+        """Write every pending change to the store"""
+        async with self._flush_lock:
+            groups, roles = self._take_dirty()
+            try:
+                await asyncio.to_thread(self._write, groups, roles)
+            except Exception as e:
+                print(f"[ERROR] State flush: {e}")
+                # Keep the records dirty and try again next interval
+                self._dirty_groups.update(groups)
+                self._dirty_roles.update(roles)
+                self._schedule_flush()
+
+    async def close(self):
+        """Force a final flush and close the store"""
+        if self._flush_task:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self.flush()
+        self.store.close()
+
+
+_state = None
+
+
+def get_state():
+    """Shared state instance, indexed on first use"""
+    global _state
+    if _state is None:
+        _state = BotState(get_store())
+    return _state
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Dependency graph of async steps run with maximum concurrency
+"""
+import asyncio
+import time
+
+
+class Step:
+    def __init__(self, name, func, after, required):
+        self.name = name
+        self.func = func
+        self.after = tuple(after)
+        self.required = required
+
+
+class StepGraph:
+    """
+    Runs each step as soon as the steps it depends on have succeeded
+
+    A step is called with the results of the steps finished so far. When a
+    step fails, the steps that depend on it are skipped; independent ones
+    still run. Timings, errors and skips are kept per step.
+    """
+
+    def __init__(self, name, on_step=None):
+        self.name = name
+        self.on_step = on_step
+        self.steps = {}
+        self.results = {}
+        self.timings = {}
+        self.errors = {}
+        self.skipped = set()
+        self.elapsed = 0.0
+        self._tasks = {}
+
+    def add(self, name, func, after=(), required=True):
+        """Register `await func(results)` to run after the named steps"""
+        for dep in after:
+            if dep not in self.steps:
+                raise ValueError(f"{name} depends on unknown step {dep}")
+        self.steps[name] = Step(name, func, after, required)
+
+    @property
+    def ok(self):
+        """True when every required step succeeded"""
+        return all(
+            name in self.results
+            for name, step in self.steps.items() if step.required
+        )
+
+    @property
+    def failed(self):
+        """Required steps that failed or were skipped"""
+        return [
+            name for name, step in self.steps.items()
+            if step.required and name not in self.results
+        ]
+
+    async def _run_step(self, step):
+        for dep in step.after:
+            if not await self._tasks[dep]:
+                self.skipped.add(step.name)
+                return False
+
+        started = time.perf_counter()
+        try:
+            self.results[step.name] = await step.func(self.results)
+        except Exception as e:
+            self.errors[step.name] = e
+            return False
+        finally:
+            self.timings[step.name] = time.perf_counter() - started
+
+        if self.on_step:
+            try:
+                self.on_step(step.name)
+            except Exception as e:
+                print(f"[STEPS] Step callback for {step.name} failed: {e}")
+        return True
+
+    async def run(self):
+        """Run every step; returns True when all required steps succeeded"""
+        started = time.perf_counter()
+        # Dependencies are registered first, so every awaited task exists
+        for step in self.steps.values():
+            self._tasks[step.name] = asyncio.create_task(self._run_step(step))
+        await asyncio.gather(*self._tasks.values())
+        self.elapsed = time.perf_counter() - started
+        return self.ok
+
+    def report(self):
+        """One line per step with its outcome and time"""
+        lines = []
+        for name in self.steps:
+            if name in self.errors:
+                outcome = f"failed after {self.timings[name]:.2f}s: {self.errors[name]}"
+            elif name in self.skipped:
+                outcome = "skipped"
+            else:
+                outcome = f"ok in {self.timings[name]:.2f}s"
+            lines.append(f"  {name}: {outcome}")
+        return f"[STEPS] {self.name} in {self.elapsed:.2f}s\n" + "\n".join(lines)
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Storage backends for escrow groups and role selections
+"""
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from config import STORE_BACKEND, STORE_PATH, GROUPS_FILE, USER_ROLES_FILE
+
+
+class GroupStore:
+    """Backend interface for group records and per-group role selections"""
+
+    def get_group(self, group_key):
+        """Group record by key, or None"""
+        raise NotImplementedError
+
+    def get_group_by_original_id(self, original_id):
+        """(group_key, record) for a full chat id, or (None, None)"""
+        raise NotImplementedError
+
+    def put_group(self, group_key, data):
+        """Insert or replace one group record"""
+        raise NotImplementedError
+
+    def all_groups(self):
+        """All group records keyed by group key"""
+        raise NotImplementedError
+
+    def get_roles(self, group_key):
+        """Role selections of a group keyed by user id"""
+        raise NotImplementedError
+
+    def put_role(self, group_key, user_id, data):
+        """Insert or replace one user's role selection"""
+        raise NotImplementedError
+
+    def all_roles(self):
+        """All role selections keyed by group key, then user id"""
+        raise NotImplementedError
+
+    @contextmanager
+    def transaction(self):
+        """Group several writes into one atomic unit"""
+        yield self
+
+    def close(self):
+        pass
+
+
+class JsonGroupStore(GroupStore):
+    """Legacy backend keeping everything in two JSON files"""
+
+    def __init__(self, groups_file=GROUPS_FILE, roles_file=USER_ROLES_FILE):
+        self.groups_file = groups_file
+        self.roles_file = roles_file
+        self.groups = self._load(groups_file)
+        self.roles = self._load(roles_file)
+        self._batch = 0
+
+    @staticmethod
+    def _load(path):
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                return json.load(f)
+        return {}
+
+    @staticmethod
+    def _save(path, data):
+        """Replace a file atomically so a crash never leaves it torn"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def _save_all(self):
+        if self._batch:
+            return
+        self._save(self.groups_file, self.groups)
+        self._save(self.roles_file, self.roles)
+
+    @contextmanager
+    def transaction(self):
+        self._batch += 1
+        try:
+            yield self
+        finally:
+            self._batch -= 1
+        self._save_all()
+
+    def get_group(self, group_key):
+        return self.groups.get(str(group_key))
+
+    def get_group_by_original_id(self, original_id):
+        for key, data in self.groups.items():
+            if data.get("original_id") == str(original_id):
+                return key, data
+        return None, None
+
+    def put_group(self, group_key, data):
+        self.groups[str(group_key)] = data
+        if not self._batch:
+            self._save(self.groups_file, self.groups)
+
+    def all_groups(self):
+        return dict(self.groups)
+
+    def get_roles(self, group_key):
+        return dict(self.roles.get(str(group_key), {}))
+
+    def put_role(self, group_key, user_id, data):
+        self.roles.setdefault(str(group_key), {})[str(user_id)] = data
+        if not self._batch:
+            self._save(self.roles_file, self.roles)
+
+    def all_roles(self):
+        return {key: dict(users) for key, users in self.roles.items()}
+
+
+class SqliteGroupStore(GroupStore):
+    """SQLite backend in WAL mode with per-record upserts"""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS groups (
+        group_key TEXT PRIMARY KEY,
+        original_id TEXT,
+        name TEXT,
+        type TEXT,
+        data TEXT NOT NULL,
+        updated_at REAL
+    );
+    CREATE INDEX IF NOT EXISTS idx_groups_original_id ON groups(original_id);
+    CREATE TABLE IF NOT EXISTS user_roles (
+        group_key TEXT NOT NULL,
+        user_id TEXT NOT NULL,
+        role TEXT,
+        data TEXT NOT NULL,
+        updated_at REAL,
+        PRIMARY KEY (group_key, user_id)
+    );
+    """
+
+    def __init__(self, path=STORE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+        self._lock = threading.RLock()
+        self._depth = 0
+
+    @contextmanager
+    def transaction(self):
+        with self._lock:
+            outermost = self._depth == 0
+            if outermost:
+                self.conn.execute("BEGIN IMMEDIATE")
+            self._depth += 1
+            try:
+                yield self
+            except Exception:
+                self._depth -= 1
+                if outermost:
+                    self.conn.execute("ROLLBACK")
+                raise
+            else:
+                self._depth -= 1
+                if outermost:
+                    self.conn.execute("COMMIT")
+
+    def get_group(self, group_key):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT data FROM groups WHERE group_key = ?", (str(group_key),)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_group_by_original_id(self, original_id):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT group_key, data FROM groups WHERE original_id = ?", (str(original_id),)
+            ).fetchone()
+        if not row:
+            return None, None
+        return row[0], json.loads(row[1])
+
+    def put_group(self, group_key, data):
+        with self.transaction():
+            self.conn.execute(
+                """
+                INSERT INTO groups (group_key, original_id, name, type, data, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(group_key) DO UPDATE SET
+                    original_id = excluded.original_id,
+                    name = excluded.name,
+                    type = excluded.type,
+                    data = excluded.data,
+                    updated_at = excluded.updated_at
+                """,
+                (
+                    str(group_key),
+                    data.get("original_id"),
+                    data.get("name"),
+                    data.get("type"),
+                    json.dumps(data),
+                    time.time()
+                )
+            )
+
+    def all_groups(self):
+        with self._lock:
+            rows = self.conn.execute("SELECT group_key, data FROM groups").fetchall()
+        return {key: json.loads(data) for key, data in rows}
+
+    def get_roles(self, group_key):
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT user_id, data FROM user_roles WHERE group_key = ?", (str(group_key),)
+            ).fetchall()
+        return {user_id: json.loads(data) for user_id, data in rows}
+
+    def put_role(self, group_key, user_id, data):
+        with self.transaction():
+            self.conn.execute(
+                """
+                INSERT INTO user_roles (group_key, user_id, role, data, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(group_key, user_id) DO UPDATE SET
+                    role = excluded.role,
+                    data = excluded.data,
+                    updated_at = excluded.updated_at
+                """,
+                (str(group_key), str(user_id), data.get("role"), json.dumps(data), time.time())
+            )
+
+    def all_roles(self):
+        with self._lock:
+            rows = self.conn.execute("SELECT group_key, user_id, data FROM user_roles").fetchall()
+        roles = {}
+        for group_key, user_id, data in rows:
+            roles.setdefault(group_key, {})[user_id] = json.loads(data)
+        return roles
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+def import_json(store, groups_file=GROUPS_FILE, roles_file=USER_ROLES_FILE):
+    """
+    One-shot import of the legacy JSON files into a store
+
+    Imported files are renamed to *.imported so the import never runs twice.
+
+    Returns:
+        tuple: (groups imported, roles imported)
+    """
+    legacy = JsonGroupStore(groups_file, roles_file)
+    group_count = 0
+    role_count = 0
+
+    with store.transaction():
+        for group_key, data in legacy.groups.items():
+            store.put_group(group_key, data)
+            group_count += 1
+        for group_key, users in legacy.roles.items():
+            for user_id, data in users.items():
+                store.put_role(group_key, user_id, data)
+                role_count += 1
+
+    for path in (groups_file, roles_file):
+        if os.path.exists(path):
+            os.replace(path, f"{path}.imported")
+
+    return group_count, role_count
+
+
+def open_store(backend=STORE_BACKEND, path=STORE_PATH):
+    """Open the configured backend, importing legacy JSON data on first use"""
+    if backend == "json":
+        return JsonGroupStore()
+
+    store = SqliteGroupStore(path)
+    if os.path.exists(GROUPS_FILE) or os.path.exists(USER_ROLES_FILE):
+        groups, roles = import_json(store)
+        print(f"[STORE] Imported {groups} groups and {roles} roles from JSON")
+    return store
+
+
+_store = None
+
+
+def get_store():
+    """Shared store instance"""
+    global _store
+    if _store is None:
+        _store = open_store()
+    return _store
+
+
+if __name__ == '__main__':
+    # python -m utils.store import [groups.json] [user_roles.json]
+    if len(sys.argv) < 2 or sys.argv[1] != "import":
+        print("Usage: python -m utils.store import [groups_file] [roles_file]")
+        sys.exit(1)
+
+    args = sys.argv[2:]
+    groups, roles = import_json(
+        SqliteGroupStore(STORE_PATH),
+        args[0] if len(args) > 0 else GROUPS_FILE,
+        args[1] if len(args) > 1 else USER_ROLES_FILE
+    )
+    print(f"✅ Imported {groups} groups and {roles} roles into {STORE_PATH}")
@@ -47,6 +47,33 @@ OTHER_CREATED_MESSAGE = """
 
 Proceed to the group to define participants and contract terms <a href="https://files.catbox.moe/f6lzpr.png">.</a>
 """
+CREATION_PROGRESS_MESSAGE = """
+𝘊𝘳𝘦𝘢𝘵𝘪𝘯𝘨 {DEAL_TYPE} 𝘌𝘴𝘤𝘳𝘰𝘸
+
+<blockquote>Please wait {MENTION}
+{STEPS}</blockquote>
+"""
+
+CREATION_QUEUED_LINE = "🕒 Position in queue: {POSITION}"
+
+CREATION_BUSY_MESSAGE = """
+𝘌𝘴𝘤𝘳𝘰𝘸 𝘊𝘳𝘦𝘢𝘵𝘪𝘰𝘯 𝘉𝘶𝘴𝘺
+
+<blockquote>Many escrows are being created right now. Please try again in a minute</blockquote>
+"""
+
+# Callback alerts are plain text
+CREATION_IN_PROGRESS_ALERT = "⏳ Your escrow is already being created"
+CREATION_RATE_LIMITED_ALERT = "You have created several escrows recently. Please try again in {MINUTES} min."
+INVALID_BUTTON_ALERT = "❌ This button is no longer valid"
+
+# Creation steps in display order, reported by create_escrow_group
+CREATION_STEPS = (
+    ("created", "Group created"),
+    ("admins", "Admins set"),
+    ("invite", "Invite link ready"),
+)
+
 INSUFFICIENT_MEMBERS_MESSAGE = """
 𝘗𝘢𝘳𝘵𝘪𝘤𝘪𝘱𝘢𝘯𝘵 𝘙𝘦𝘲𝘶𝘪𝘳𝘦𝘮𝘦𝘯𝘵
 